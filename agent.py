@@ -0,0 +1,152 @@
+import asyncio
+import itertools
+import sys
+import time
+
+from google.genai import types
+
+from config import (
+    SESSION_MAX_ITERATIONS,
+    SESSION_TIMEOUT,
+    SESSION_TOKEN_BUDGET,
+    SYSTEM_PROMPT,
+)
+from context import ContextManager
+from dispatch import AsyncDispatcher
+from functions.call_function import get_available_functions
+from tracing import current_session, tracer
+
+_session_ids = itertools.count(1)
+
+
+async def run_session(
+    client, prompt, model, verbose=False, out=sys.stdout, context=None
+):
+    # Pass a ContextManager to read the session's usage once it is done
+    current_session.set(next(_session_ids))
+    if context is None:
+        context = ContextManager(prompt)
+    started = time.perf_counter()
+    try:
+        return await _run_turns(client, prompt, model, verbose, out, context)
+    finally:
+        tracer.event(
+            "session",
+            iterations=context.iterations,
+            stopped=context.stopped,
+            duration_s=time.perf_counter() - started,
+            prompt_tokens=context.total_prompt_tokens,
+            response_tokens=context.total_response_tokens,
+        )
+
+
+async def _run_turns(client, prompt, model, verbose, out, context):
+    config = types.GenerateContentConfig(
+        tools=[get_available_functions()], system_instruction=SYSTEM_PROMPT
+    )
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SESSION_TIMEOUT
+
+    for iteration in itertools.count(1):
+        if loop.time() >= deadline:
+            context.stopped = "timeout"
+        elif context.total_tokens >= SESSION_TOKEN_BUDGET:
+            context.stopped = "token budget"
+        elif iteration > SESSION_MAX_ITERATIONS:
+            context.stopped = "iteration limit"
+        if context.stopped:
+            if verbose:
+                print(f"Stopping session: {context.stopped} reached")
+            return None
+
+        context.iterations = iteration
+        if context.compact() and verbose:
+            print(f"Compacted context to ~{context.estimated_tokens} tokens")
+
+        dispatcher = AsyncDispatcher(verbose=verbose)
+        parts = []
+        usage_metadata = None
+
+        # Bounds the wait for rate limits, retries and the stream itself
+        timeout = asyncio.timeout_at(deadline)
+        try:
+            with tracer.span("generate", model, iteration=iteration) as span:
+                async with timeout:
+                    started = time.perf_counter()
+                    stream = await client.aio.models.generate_content_stream(
+                        model=model,
+                        contents=context.messages,
+                        config=config,
+                    )
+                    async for chunk in stream:
+                        span.setdefault("first_chunk_s", time.perf_counter() - started)
+                        if chunk.usage_metadata:
+                            usage_metadata = chunk.usage_metadata
+                        if not chunk.candidates or not chunk.candidates[0].content:
+                            continue
+                        for part in chunk.candidates[0].content.parts or []:
+                            parts.append(part)
+                            # Start tools right away instead of waiting for the full turn
+                            if part.function_call:
+                                dispatcher.submit(part.function_call)
+                            elif part.text and not part.thought and out:
+                                out.write(part.text)
+                                out.flush()
+                    if usage_metadata:
+                        span["prompt_tokens"] = usage_metadata.prompt_token_count
+                        span["response_tokens"] = usage_metadata.candidates_token_count
+                    span["function_calls"] = len(dispatcher)
+        except Exception:
+            await dispatcher.drain()
+            if timeout.expired():
+                context.stopped = "timeout"
+                continue  # Reported at the top of the loop
+            raise
+
+        context.record_usage(usage_metadata)
+        context.add_model_turn(types.Content(role="model", parts=parts))
+
+        if dispatcher:
+            function_call_results = await dispatcher.results()
+            context.add_tool_results(function_call_results)
+            for function_call_result in function_call_results:
+                if verbose:
+                    print(
+                        f"-> {function_call_result.parts[0].function_response.response}"
+                    )
+            continue  # Skip to the next iteration if function calls are present
+
+        text = "".join(part.text for part in parts if part.text and not part.thought)
+
+        if out and text:
+            out.write("\n")
+            out.flush()
+
+        if verbose and usage_metadata:
+            print(f"User prompt: {prompt}")
+            print(f"Prompt tokens: {usage_metadata.prompt_token_count}")
+            print(f"Response tokens: {usage_metadata.candidates_token_count}")
+
+        if text:
+            return text  # Stop once the model answers with text
+
+        # Neither text nor function calls (blocked, empty or thoughts only):
+        # asking again would get the same answer
+        context.stopped = "empty response"
+
+
+async def run_sessions(client, prompts, model, verbose=False, concurrency=None):
+    # Independent prompts share one client and event loop. Their text is
+    # collected rather than streamed so outputs do not interleave. With a
+    # concurrency limit, at most that many sessions run at once.
+    prompts = list(prompts)
+    semaphore = asyncio.Semaphore(concurrency or max(1, len(prompts)))
+
+    async def run(prompt):
+        async with semaphore:
+            return await run_session(client, prompt, model, verbose=verbose, out=None)
+
+    return await asyncio.gather(
+        *(run(prompt) for prompt in prompts), return_exceptions=True
+    )
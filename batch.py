@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+import stat
+import time
+
+from agent import run_session
+from config import MAX_CONCURRENT_SESSIONS
+from context import ContextManager
+
+
+def parse_request(line, number):
+    # A request line is a JSON object with a "prompt" and optionally an "id"
+    # (defaults to the line number) and a "model", or just a JSON string
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as e:
+        return {"id": number, "error": f"invalid JSON: {e}"}
+    if isinstance(request, str):
+        request = {"prompt": request}
+    if not isinstance(request, dict) or not isinstance(request.get("prompt"), str):
+        return {"id": number, "error": 'expected a string or an object with "prompt"'}
+    request.setdefault("id", number)
+    return request
+
+
+def read_requests(lines):
+    for number, line in enumerate(lines, 1):
+        if line.strip():
+            yield parse_request(line, number)
+
+
+async def run_request(client, request, model, verbose=False):
+    # Runs one request to completion and returns the record written for it
+    record = {"id": request["id"]}
+    if "error" in request:
+        record["error"] = request["error"]
+        return record
+
+    context = ContextManager(request["prompt"])
+    start = time.perf_counter()
+    try:
+        record["result"] = await run_session(
+            client,
+            request["prompt"],
+            request.get("model", model),
+            verbose=verbose,
+            out=None,
+            context=context,
+        )
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record.update(
+        iterations=context.iterations,
+        stopped=context.stopped,
+        prompt_tokens=context.total_prompt_tokens,
+        response_tokens=context.total_response_tokens,
+        duration_s=round(time.perf_counter() - start, 3),
+    )
+    return record
+
+
+async def run_batch(
+    client, requests, model, output, concurrency=MAX_CONCURRENT_SESSIONS, verbose=False
+):
+    # A fixed set of workers pulls requests as they go, so a long backlog is
+    # never loaded up front, and each record is written as soon as its session
+    # finishes (in completion order, matched up by "id")
+    requests = iter(requests)
+    lock = asyncio.Lock()
+
+    async def worker():
+        while True:
+            async with lock:
+                # Reading may block, e.g. on stdin, so it happens off the loop
+                request = await asyncio.to_thread(next, requests, None)
+            if request is None:
+                return
+            record = await run_request(client, request, model, verbose)
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+
+async def serve(
+    client, path, model, concurrency=MAX_CONCURRENT_SESSIONS, verbose=False
+):
+    # Takes request lines on a Unix socket and answers each with its record
+    # line on the same connection. Sessions from every connection share one
+    # concurrency limit.
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def handle(reader, writer):
+        async def respond(request):
+            async with semaphore:
+                record = await run_request(client, request, model, verbose)
+            writer.write((json.dumps(record) + "\n").encode())
+            await writer.drain()
+
+        tasks = set()
+        number = 0
+        try:
+            while line := await reader.readline():
+                number += 1
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(
+                    respond(parse_request(line.decode("utf-8", "replace"), number))
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    # A socket left behind by an earlier run would make the bind fail
+    if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(handle, path)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
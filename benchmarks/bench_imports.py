@@ -0,0 +1,65 @@
+# Import cost of the CLI startup path, from python -X importtime in a fresh
+# interpreter per run.
+#
+#   python benchmarks/bench_imports.py             # main.py --help
+#   python benchmarks/bench_imports.py agent       # any module
+#   python benchmarks/bench_imports.py --top 20
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(arguments):
+    # Runs python -X importtime with arguments (a script and its arguments,
+    # or -c code) and returns {module: (self µs, cumulative µs)} for every
+    # module imported, plus the total for the top-level imports
+    environment = dict(os.environ)
+    environment.pop("GEMINI_API_KEY", None)  # Stop main.py before the network
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", *arguments],
+        cwd=ROOT,
+        env=environment,
+        capture_output=True,
+        text=True,
+    )
+    modules = {}
+    total = 0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        if not own.strip().isdigit():
+            continue  # The header line
+        modules[name.strip()] = (int(own), int(cumulative))
+        if not name.startswith("  "):
+            total += int(cumulative)
+    return modules, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the slowest imports")
+    parser.add_argument(
+        "module", nargs="?", help="Module to import instead of running main.py --help"
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="Number of modules to list (default: 10)"
+    )
+    args = parser.parse_args()
+
+    arguments = ["main.py", "--help"]
+    if args.module:
+        arguments = ["-c", f"import {args.module}"]
+    modules, total = import_times(arguments)
+
+    print(f"{' '.join(arguments)}: {total / 1000:.1f} ms in imports")
+    slowest = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (own, cumulative) in slowest[: args.top]:
+        print(f"  {name:<40} {cumulative / 1000:8.1f} ms ({own / 1000:.1f} ms own)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Compares the regex lexer in calculator/pkg/calculator.py with the
+# split()-based tokenizing it replaced, per expression.
+#
+#   python benchmarks/bench_lexer.py
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "calculator"
+    ),
+)
+
+from pkg.calculator import Calculator, tokenize
+
+
+def split_tokenize(expression):
+    # The previous tokenizer: space-separated tokens and a float() attempt each
+    tokens = []
+    for token in expression.strip().split():
+        if token in "+-*/":
+            tokens.append(token)
+        else:
+            try:
+                tokens.append(float(token))
+            except ValueError:
+                tokens.append(token)
+    return tokens
+
+
+def generate_expressions(count, terms=8, seed=0):
+    rng = random.Random(seed)
+    expressions = []
+    for _ in range(count):
+        parts = [str(rng.randint(1, 999))]
+        for _ in range(terms - 1):
+            parts.append(rng.choice("+-*/"))
+            parts.append(str(rng.randint(1, 999)))
+        expressions.append(" ".join(parts))
+    return expressions
+
+
+def per_expression(function, expressions, repeat=5):
+    best = min(
+        timeit.repeat(
+            lambda: [function(expression) for expression in expressions],
+            number=1,
+            repeat=repeat,
+        )
+    )
+    return best / len(expressions) * 1e6
+
+
+def main():
+    expressions = generate_expressions(10000)
+    calculator = Calculator(cache_size=0)
+
+    rows = [
+        ("split tokenize", per_expression(split_tokenize, expressions)),
+        ("lexer tokenize", per_expression(tokenize, expressions)),
+        ("lexer + compile", per_expression(calculator.compile, expressions)),
+        ("evaluate, uncached", per_expression(calculator.evaluate, expressions)),
+    ]
+    for name, microseconds in rows:
+        print(f"{name:<20} {microseconds:8.2f} us/expression")
+
+
+if __name__ == "__main__":
+    main()
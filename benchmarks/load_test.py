@@ -0,0 +1,191 @@
+# End-to-end load test of the agent loop against a local fake model: runs many
+# concurrent sessions over the calculator working directory and reports
+# throughput, iterations per session, model and tool latency, and peak memory.
+#
+#   python benchmarks/load_test.py                          # 200 sessions
+#   python benchmarks/load_test.py --sessions 500 --concurrency 100
+#   python benchmarks/load_test.py --script turns.json --latency 0.2
+#   python benchmarks/load_test.py --rpm 600 --error-rate 0.05
+#   python benchmarks/load_test.py --json
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # WORKING_DIRECTORY is relative to the repository root
+
+from agent import run_sessions
+from fake_model import FakeClient
+from scheduler import RateLimitedClient
+from tracing import percentile, tracer
+
+
+def _latencies(durations):
+    return {
+        "calls": len(durations),
+        "p50_ms": percentile(durations, 0.5) * 1000,
+        "p95_ms": percentile(durations, 0.95) * 1000,
+        "p99_ms": percentile(durations, 0.99) * 1000,
+        "max_ms": max(durations, default=0.0) * 1000,
+    }
+
+
+def report(results, records, elapsed):
+    iterations = [
+        record["iterations"]
+        for record in records
+        if record["type"] == "event" and record["kind"] == "session"
+    ]
+    generations = [
+        record["duration_s"]
+        for record in records
+        if record["type"] == "span" and record["kind"] == "generate"
+    ]
+    tools = defaultdict(list)
+    waited = 0.0
+    retries = 0
+    for record in records:
+        if record["type"] == "span" and record["kind"] == "tool":
+            tools[record["name"]].append(record["duration_s"])
+        elif record["type"] == "event" and record["kind"] in (
+            "retry",
+            "rate_limit_wait",
+        ):
+            waited += record["seconds"]
+            retries += record["kind"] == "retry"
+
+    failures = [result for result in results if isinstance(result, BaseException)]
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    peak_children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return {
+        "sessions": len(results),
+        "failed": len(failures),
+        "errors": sorted({f"{type(e).__name__}: {e}" for e in failures})[:5],
+        "elapsed_s": elapsed,
+        "sessions_per_s": len(results) / elapsed,
+        "model_calls_per_s": len(generations) / elapsed,
+        "iterations": {
+            "mean": statistics.mean(iterations) if iterations else 0,
+            "max": max(iterations, default=0),
+        },
+        "generate": _latencies(generations),
+        "retries": retries,
+        "scheduler_wait_s": waited,
+        "tools": {name: _latencies(durations) for name, durations in tools.items()},
+        "peak_rss_mb": peak_rss,
+        "peak_child_rss_mb": peak_children_rss,
+    }
+
+
+def print_report(summary):
+    print(
+        f"{summary['sessions']} sessions in {summary['elapsed_s']:.2f}s: "
+        f"{summary['sessions_per_s']:.1f} sessions/s, "
+        f"{summary['model_calls_per_s']:.1f} model calls/s, "
+        f"{summary['failed']} failed"
+    )
+    for error in summary["errors"]:
+        print(f"  {error}")
+    print(
+        f"iterations per session: mean {summary['iterations']['mean']:.2f}, "
+        f"max {summary['iterations']['max']}"
+    )
+    if summary["retries"] or summary["scheduler_wait_s"]:
+        print(
+            f"scheduler: {summary['retries']} retries, "
+            f"{summary['scheduler_wait_s']:.2f}s waiting across sessions"
+        )
+    print(
+        f"{'':<20} {'calls':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    )
+    rows = [("generate", summary["generate"]), *sorted(summary["tools"].items())]
+    for name, latency in rows:
+        print(
+            f"{name:<20} {latency['calls']:>7} {latency['p50_ms']:>9.2f} "
+            f"{latency['p95_ms']:>9.2f} {latency['p99_ms']:>9.2f} "
+            f"{latency['max_ms']:>9.2f}"
+        )
+    print(
+        f"peak memory: {summary['peak_rss_mb']:.1f} MB, "
+        f"{summary['peak_child_rss_mb']:.1f} MB in the largest child process"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test the agent loop with a fake model"
+    )
+    parser.add_argument(
+        "--sessions", type=int, default=200, help="Sessions to run (default: 200)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=200,
+        help="Sessions running at once (default: 200)",
+    )
+    parser.add_argument("--script", help="JSON script of fake model turns")
+    parser.add_argument(
+        "--latency", type=float, help="Seconds before the fake model's first chunk"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, help="Share of model requests failing with 429"
+    )
+    parser.add_argument(
+        "--rpm",
+        type=int,
+        default=0,
+        help="Pace model requests per minute through the scheduler (default: off)",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=int,
+        default=0,
+        help="Pace model tokens per minute through the scheduler (default: off)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print a JSON report")
+    args = parser.parse_args()
+
+    overrides = {"seed": 0}
+    if args.latency is not None:
+        overrides["latency"] = args.latency
+    if args.error_rate is not None:
+        overrides["error_rate"] = args.error_rate
+    client = FakeClient.from_script(args.script, **overrides)
+    if args.rpm or args.tpm or args.error_rate:
+        client = RateLimitedClient(
+            client,
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+            backoff_base=0.05,
+        )
+
+    prompts = [f"Synthetic task {number}" for number in range(args.sessions)]
+    tracer.keep_records = True  # The report is built from the trace records
+    start = time.perf_counter()
+    # Tool calls announce themselves on stdout; keep that out of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = asyncio.run(
+            run_sessions(client, prompts, "fake-model", concurrency=args.concurrency)
+        )
+    elapsed = time.perf_counter() - start
+
+    summary = report(results, tracer.records, elapsed)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+# Benchmarks for the agent tools and the calculator hot paths.
+#
+#   python benchmarks/run.py                       # run everything, print JSON
+#   python benchmarks/run.py --filter calculator   # only matching benchmarks
+#   python benchmarks/run.py --output results.json
+#   python benchmarks/run.py --save-baseline       # refresh benchmarks/baseline.json
+#   python benchmarks/run.py --compare             # fail if slower than the baseline
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "calculator"))
+
+import functions.call_function as call_function
+import functions.run_python as run_python
+from bench_imports import import_times
+from bench_lexer import generate_expressions
+from config import FILES_INFO_PAGE_SIZE
+from functions.file_index import get_file_index
+from functions.get_file_content import get_file_content
+from functions.get_files_info import get_files_info
+from functions.sandbox import set_workspace
+from functions.tool_cache import ToolCache
+from functions.write_file import write_file
+from pkg.calculator import Calculator
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+BENCHMARKS = {}
+
+
+def benchmark(name, repeat=5):
+    def register(function):
+        BENCHMARKS[name] = (function, repeat)
+        return function
+
+    return register
+
+
+def measure(function, repeat):
+    # Each benchmark does its own setup and returns the seconds spent in the
+    # timed section only, so fixtures and pauses stay out of the numbers
+    samples = []
+    for _ in range(repeat):
+        samples.append(function())
+    return {
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "runs": repeat,
+    }
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def make_tree(root, directories=40, files_per_directory=50):
+    for d in range(directories):
+        directory = os.path.join(root, f"pkg{d}", "sub")
+        os.makedirs(directory)
+        for f in range(files_per_directory):
+            with open(os.path.join(directory, f"module{f}.py"), "w") as file:
+                file.write(f"VALUE = {f}\n" * (f + 1))
+
+
+def make_large_file(path, lines=200000):
+    with open(path, "w") as file:
+        for number in range(lines):
+            file.write(f"line {number}: lorem ipsum dolor sit amet\n")
+
+
+_fixtures = tempfile.TemporaryDirectory(prefix="agent-bench-")
+TREE = os.path.join(_fixtures.name, "tree")
+LARGE = os.path.join(_fixtures.name, "large")
+SCRIPTS = os.path.join(_fixtures.name, "scripts")
+SMALL = os.path.join(_fixtures.name, "small")
+EXPRESSIONS = generate_expressions(5000)
+
+
+def _setup():
+    make_tree(TREE)
+    os.makedirs(LARGE)
+    make_large_file(os.path.join(LARGE, "big.txt"))
+    os.makedirs(SCRIPTS)
+    with open(os.path.join(SCRIPTS, "hello.py"), "w") as file:
+        file.write("print('hello')\n")
+    os.makedirs(SMALL)
+    with open(os.path.join(ROOT, "calculator", "pkg", "calculator.py")) as source:
+        with open(os.path.join(SMALL, "calculator.py"), "w") as file:
+            file.write(source.read())
+
+
+@benchmark("get_files_info.top_level")
+def bench_files_info_top_level():
+    get_file_index(TREE).clear()
+    return timed(get_files_info, TREE, ".")
+
+
+def list_tree(root):
+    # Pages through the whole recursive listing, as the model would have to
+    offset = 0
+    while True:
+        result = get_files_info(root, ".", recursive=True, offset=offset)
+        if "call again with offset=" not in result:
+            return
+        offset += FILES_INFO_PAGE_SIZE
+
+
+@benchmark("get_files_info.recursive_cold")
+def bench_files_info_recursive_cold():
+    get_file_index(TREE).clear()
+    return timed(list_tree, TREE)
+
+
+@benchmark("get_files_info.recursive_warm")
+def bench_files_info_recursive_warm():
+    list_tree(TREE)
+    return timed(list_tree, TREE)
+
+
+@benchmark("get_file_content.head")
+def bench_file_content_head():
+    return timed(get_file_content, LARGE, "big.txt")
+
+
+@benchmark("get_file_content.offset_middle")
+def bench_file_content_offset():
+    return timed(get_file_content, LARGE, "big.txt", offset=4_000_000)
+
+
+@benchmark("get_file_content.lines_near_end")
+def bench_file_content_lines():
+    return timed(get_file_content, LARGE, "big.txt", start_line=199000, end_line=199100)
+
+
+def _run_python(pool_size):
+    previous = run_python.RUN_PYTHON_WARM_POOL_SIZE
+    run_python.RUN_PYTHON_WARM_POOL_SIZE = pool_size
+    try:
+        run_python.run_python_file(SCRIPTS, "hello.py")
+        time.sleep(0.3)  # Let the pool refill, as it would between model turns
+        return timed(run_python.run_python_file, SCRIPTS, "hello.py")
+    finally:
+        run_python.RUN_PYTHON_WARM_POOL_SIZE = previous
+
+
+def _read_through_call_function(tool_cache, reads=100):
+    # Small reads as the model issues them, answered by the tool or the cache
+    from google.genai import types
+
+    function_call = types.FunctionCall(
+        name="get_file_content", args={"file_path": "calculator.py"}
+    )
+    previous = call_function.tool_cache
+    call_function.tool_cache = tool_cache
+    set_workspace(SMALL)
+    try:
+        # call_function announces each call on stdout
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            call_function.call_function(function_call)
+            start = time.perf_counter()
+            for _ in range(reads):
+                call_function.call_function(function_call)
+            return time.perf_counter() - start
+    finally:
+        call_function.tool_cache = previous
+
+
+@benchmark("tool_cache.read_100_uncached")
+def bench_read_uncached():
+    return _read_through_call_function(None)
+
+
+@benchmark("tool_cache.read_100_cached")
+def bench_read_cached():
+    directory = tempfile.mkdtemp(dir=_fixtures.name)
+    tool_cache = ToolCache(os.path.join(directory, "cache.sqlite"), 1024 * 1024)
+    return _read_through_call_function(tool_cache)
+
+
+@benchmark("run_python_file.fresh_interpreter")
+def bench_run_python_fresh():
+    return _run_python(0)
+
+
+@benchmark("run_python_file.warm_pool")
+def bench_run_python_pool():
+    return _run_python(2)
+
+
+@benchmark("write_file.200_files_4k", repeat=3)
+def bench_write_file():
+    content = "x = 1\n" * 700
+    directory = tempfile.mkdtemp(dir=_fixtures.name)
+    start = time.perf_counter()
+    for number in range(200):
+        write_file(directory, f"file{number}.py", content)
+    return time.perf_counter() - start
+
+
+@benchmark("startup.main_help")
+def bench_startup_help():
+    return timed(
+        subprocess.run,
+        [sys.executable, os.path.join(ROOT, "main.py"), "--help"],
+        capture_output=True,
+    )
+
+
+@benchmark("startup.import_agent")
+def bench_startup_import_agent():
+    # Everything a real run imports, google.genai included
+    _, total = import_times(["-c", "import agent"])
+    return total / 1_000_000
+
+
+@benchmark("calculator.evaluate_5000_uncached")
+def bench_calculator_uncached():
+    calculator = Calculator(cache_size=0)
+    return timed(calculator.evaluate_many, EXPRESSIONS)
+
+
+@benchmark("calculator.evaluate_5000_cached")
+def bench_calculator_cached():
+    calculator = Calculator(cache_size=len(EXPRESSIONS))
+    calculator.evaluate_many(EXPRESSIONS)
+    return timed(calculator.evaluate_many, EXPRESSIONS)
+
+
+def run(names):
+    _setup()
+    results = {}
+    for name in names:
+        function, repeat = BENCHMARKS[name]
+        results[name] = measure(function, repeat)
+        print(
+            f"{name:<40} {results[name]['median_s'] * 1000:10.3f} ms", file=sys.stderr
+        )
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold):
+    # Returns the benchmarks whose median is more than threshold times slower
+    regressions = []
+    for name, result in report["results"].items():
+        previous = baseline["results"].get(name)
+        if not previous:
+            print(f"{name:<40} {'new':>10}")
+            continue
+        ratio = result["median_s"] / previous["median_s"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{name:<40} {ratio:9.2f}x{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark agent tools and the calculator"
+    )
+    parser.add_argument(
+        "--filter", default="", help="Only run benchmarks containing this text"
+    )
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help=f"Store the report as the baseline ({os.path.relpath(BASELINE_PATH, ROOT)})",
+    )
+    parser.add_argument(
+        "--compare",
+        nargs="?",
+        const=BASELINE_PATH,
+        help="Compare against a baseline report and exit 1 on regressions",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Slowdown ratio counted as a regression (default: 1.25)",
+    )
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    report = run(names)
+    encoded = json.dumps(report, indent=2, sort_keys=True)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(encoded + "\n")
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as file:
+            file.write(encoded + "\n")
+    if not args.output and not args.save_baseline:
+        print(encoded)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,58 @@
 # main.py
 
+import argparse
 import sys
+from pkg.batch import evaluate_stream, format_results, read_expressions
 from pkg.calculator import Calculator
 from pkg.render import render
 
 
+def batch_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py --batch",
+        description="Evaluate newline-delimited expressions",
+    )
+    parser.add_argument(
+        "file",
+        nargs="?",
+        help="File with one expression per line (default: stdin)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["plain", "csv", "jsonl"],
+        default="plain",
+        help="Output format (default: plain)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes to evaluate with (default: 1)",
+    )
+    args = parser.parse_args(argv)
+
+    source = open(args.file, encoding="utf-8") if args.file else sys.stdin
+    with source:
+        results = evaluate_stream(read_expressions(source), workers=args.workers)
+        for line in format_results(results, args.format):
+            sys.stdout.write(line + "\n")
+
+
 def main():
     calculator = Calculator()
     if len(sys.argv) <= 1:
         print("Calculator App")
         print('Usage: python main.py "<expression>"')
+        print(
+            "       python main.py --batch [file] [--format plain|csv|jsonl] [--workers N]"
+        )
         print('Example: python main.py "3 + 5"')
         return
 
+    if sys.argv[1] == "--batch":
+        batch_main(sys.argv[2:])
+        return
+
     expression = " ".join(sys.argv[1:])
     try:
         result = calculator.evaluate(expression)
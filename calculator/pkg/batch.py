@@ -0,0 +1,82 @@
+# batch.py
+
+import csv
+import io
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from pkg.calculator import Calculator
+from pkg.render import format_result
+
+_calculator = None
+
+
+def read_expressions(lines):
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def _evaluate_chunk(expressions):
+    # Runs in worker processes, each keeping its own compiled-program cache
+    global _calculator
+    if _calculator is None:
+        _calculator = Calculator()
+    results = []
+    for expression in expressions:
+        try:
+            results.append((expression, _calculator.evaluate(expression), None))
+        except Exception as e:
+            results.append((expression, None, str(e)))
+    return results
+
+
+def evaluate_stream(expressions, workers=1, chunk_size=1000):
+    # Yields (expression, result, error) in input order. Input is consumed
+    # chunk by chunk, with at most two chunks per worker in flight, so memory
+    # stays bounded however long the input is.
+    expressions = iter(expressions)
+    chunks = iter(lambda: list(islice(expressions, chunk_size)), [])
+
+    if workers <= 1:
+        for chunk in chunks:
+            yield from _evaluate_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_evaluate_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def format_results(results, output_format="plain"):
+    if output_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="")
+        writer.writerow(["expression", "result", "error"])
+        yield buffer.getvalue()
+        for expression, result, error in results:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(
+                [expression, "" if error else format_result(result), error or ""]
+            )
+            yield buffer.getvalue()
+    elif output_format == "jsonl":
+        for expression, result, error in results:
+            yield json.dumps(
+                {"expression": expression, "result": result, "error": error}
+            )
+    else:
+        for expression, result, error in results:
+            if error:
+                yield f"{expression} = Error: {error}"
+            else:
+                yield f"{expression} = {format_result(result)}"
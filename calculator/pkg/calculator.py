@@ -1,62 +1,215 @@
 # calculator.py
 
+import operator
+import re
+import string
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# One pass over the expression in C: whitespace is skipped and every other
+# character lands in a token. Numbers may use scientific notation, and any
+# character that is not part of a number, name or symbol becomes a token of
+# its own so it can be reported.
+_NUMBER = r"(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_TOKEN_PATTERN = re.compile(rf"{_NUMBER}|[A-Za-z_]\w*|[-+*/()]|\S")
+# A token is a number only if the number part matched it; a lone "." is not
+_NUMBER_PATTERN = re.compile(_NUMBER)
+_NAME_START = frozenset(string.ascii_letters + "_")
+
+
+def tokenize(expression):
+    # e.g. "2*(x-1e3)" -> ["2", "*", "(", "x", "-", "1e3", ")"]
+    return _TOKEN_PATTERN.findall(expression)
+
+
+class Program:
+    # An expression compiled to postfix order, ready to be evaluated many
+    # times. Each instruction is (kind, value): a number, a variable name, a
+    # binary operator function or a unary operator function.
+    NUMBER = 0
+    VARIABLE = 1
+    OPERATOR = 2
+    UNARY = 3
+
+    def __init__(self, expression, code):
+        self.expression = expression
+        self.code = code
+        self.variables = {value for kind, value in code if kind == Program.VARIABLE}
+
+    def run(self, variables=None):
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for kind, value in self.code:
+            if kind == Program.NUMBER:
+                push(value)
+            elif kind == Program.VARIABLE:
+                if variables is None or value not in variables:
+                    raise ValueError(f"unknown variable: {value}")
+                push(variables[value])
+            elif kind == Program.UNARY:
+                push(value(pop()))
+            else:
+                b = pop()
+                a = pop()
+                push(value(a, b))
+        return stack[0]
+
+    def run_columns(self, columns):
+        # Evaluates the program once per row of equally long columns. With
+        # NumPy the whole batch is one vectorized pass returning an array;
+        # without it each row goes through run() and a list is returned.
+        for name in self.variables:
+            if name not in columns:
+                raise ValueError(f"unknown variable: {name}")
+        lengths = {len(columns[name]) for name in self.variables}
+        if len(lengths) > 1:
+            raise ValueError("columns must all have the same length")
+
+        if np is None:
+            names = list(self.variables)
+            if not names:
+                return [self.run()]
+            rows = zip(*(columns[name] for name in names))
+            return [self.run(dict(zip(names, row))) for row in rows]
+
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for kind, value in self.code:
+            if kind == Program.NUMBER:
+                push(value)
+            elif kind == Program.VARIABLE:
+                push(np.asarray(columns[value], dtype=float))
+            elif kind == Program.UNARY:
+                push(value(pop()))
+            else:
+                b = pop()
+                a = pop()
+                # NumPy would quietly produce inf, the scalar path raises
+                if value is operator.truediv and np.any(b == 0):
+                    raise ZeroDivisionError("float division by zero")
+                push(value(a, b))
+
+        result = stack[0]
+        return np.broadcast_to(result, (lengths.pop() if lengths else 1,)).copy()
+
 
 class Calculator:
-    def __init__(self):
+    def __init__(self, cache_size=1024):
         self.operators = {
-            "+": lambda a, b: a + b,
-            "-": lambda a, b: a - b,
-            "*": lambda a, b: a * b,
-            "/": lambda a, b: a / b,
+            "+": operator.add,
+            "-": operator.sub,
+            "*": operator.mul,
+            "/": operator.truediv,
+        }
+        # Prefix operators, keyed by how they sit on the operator stack
+        self.unary_operators = {
+            "unary -": operator.neg,
         }
         self.precedence = {
             "+": 1,
             "-": 1,
             "*": 2,
             "/": 2,
+            "unary -": 3,
         }
+        self._compile_cached = lru_cache(maxsize=cache_size)(self._compile)
 
-    def evaluate(self, expression):
+    def compile(self, expression):
         if not expression or expression.isspace():
             return None
-        tokens = expression.strip().split()
-        return self._evaluate_infix(tokens)
+        return self._compile_cached(expression)
+
+    def evaluate(self, expression, variables=None):
+        if isinstance(expression, Program):
+            return expression.run(variables)
+        program = self.compile(expression)
+        if program is None:
+            return None
+        return program.run(variables)
+
+    def evaluate_many(self, expressions, variables=None):
+        return [self.evaluate(expression, variables) for expression in expressions]
+
+    def evaluate_columns(self, expression, columns):
+        program = expression
+        if not isinstance(expression, Program):
+            program = self.compile(expression)
+        if program is None:
+            return None
+        return program.run_columns(columns)
+
+    def _compile(self, expression):
+        return Program(expression, self._to_postfix(tokenize(expression)))
 
-    def _evaluate_infix(self, tokens):
-        values = []
+    def _to_postfix(self, tokens):
+        code = []
         operators = []
+        # Operands on the stack once the code emitted so far has run, used to
+        # reject malformed expressions at compile time
+        depth = 0
+        # True at the start and after an operator or "(", where a "-" is unary
+        expect_operand = True
 
-        for token in tokens:
-            if token in self.operators:
+        for text in tokens:
+            if _NUMBER_PATTERN.fullmatch(text):
+                code.append((Program.NUMBER, float(text)))
+                depth += 1
+                expect_operand = False
+            elif text[0] in _NAME_START:
+                code.append((Program.VARIABLE, text))
+                depth += 1
+                expect_operand = False
+            elif text == "(":
+                operators.append(text)
+                expect_operand = True
+            elif text == ")":
+                while operators and operators[-1] != "(":
+                    depth = self._emit_operator(operators, code, depth)
+                if not operators:
+                    raise ValueError("mismatched parentheses")
+                operators.pop()
+                expect_operand = False
+            elif text in self.operators:
+                if expect_operand and "unary " + text in self.unary_operators:
+                    operators.append("unary " + text)
+                    continue
                 while (
                     operators
-                    and operators[-1] in self.operators
-                    and self.precedence[operators[-1]] >= self.precedence[token]
+                    and operators[-1] != "("
+                    and self.precedence[operators[-1]] >= self.precedence[text]
                 ):
-                    self._apply_operator(operators, values)
-                operators.append(token)
+                    depth = self._emit_operator(operators, code, depth)
+                operators.append(text)
+                expect_operand = True
             else:
-                try:
-                    values.append(float(token))
-                except ValueError:
-                    raise ValueError(f"invalid token: {token}")
+                raise ValueError(f"invalid token: {text}")
 
         while operators:
-            self._apply_operator(operators, values)
+            if operators[-1] == "(":
+                raise ValueError("mismatched parentheses")
+            depth = self._emit_operator(operators, code, depth)
 
-        if len(values) != 1:
+        if depth != 1:
             raise ValueError("invalid expression")
 
-        return values[0]
+        return code
 
-    def _apply_operator(self, operators, values):
-        if not operators:
-            return
+    def _emit_operator(self, operators, code, depth):
+        symbol = operators.pop()
+        if symbol in self.unary_operators:
+            if depth < 1:
+                raise ValueError(f"not enough operands for operator {symbol[-1]}")
+            code.append((Program.UNARY, self.unary_operators[symbol]))
+            return depth
 
-        operator = operators.pop()
-        if len(values) < 2:
-            raise ValueError(f"not enough operands for operator {operator}")
+        if depth < 2:
+            raise ValueError(f"not enough operands for operator {symbol}")
 
-        b = values.pop()
-        a = values.pop()
-        values.append(self.operators[operator](a, b))
+        code.append((Program.OPERATOR, self.operators[symbol]))
+        return depth - 1
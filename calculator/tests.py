@@ -1,7 +1,8 @@
 # tests.py
 
 import unittest
-from pkg.calculator import Calculator
+from pkg.batch import evaluate_stream, format_results, read_expressions
+from pkg.calculator import Calculator, Program
 
 
 class TestCalculator(unittest.TestCase):
@@ -44,6 +45,104 @@ class TestCalculator(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.calculator.evaluate("+ 3")
 
+    def test_compile_reuses_program(self):
+        program = self.calculator.compile("3 * 4 + 5")
+        self.assertIsInstance(program, Program)
+        self.assertIs(self.calculator.compile("3 * 4 + 5"), program)
+        self.assertEqual(self.calculator.evaluate(program), 17)
+
+    def test_variables(self):
+        program = self.calculator.compile("x * 2 + y")
+        self.assertEqual(self.calculator.evaluate(program, {"x": 3, "y": 1}), 7)
+        self.assertEqual(self.calculator.evaluate("x / 2", {"x": 5}), 2.5)
+
+    def test_unknown_variable(self):
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("x + 1")
+
+    def test_evaluate_many(self):
+        results = self.calculator.evaluate_many(["3 + 5", "", "10 / 4"])
+        self.assertEqual(results, [8, None, 2.5])
+
+    def test_division_by_zero(self):
+        program = self.calculator.compile("1 / x")
+        with self.assertRaises(ZeroDivisionError):
+            self.calculator.evaluate(program, {"x": 0})
+
+    def test_invalid_expression(self):
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("3 5")
+
+    def test_evaluate_columns(self):
+        result = self.calculator.evaluate_columns(
+            "x * 2 + y / 4", {"x": [1, 2, 3], "y": [4, 8, 12]}
+        )
+        self.assertEqual(list(result), [3, 6, 9])
+
+    def test_evaluate_columns_without_variables(self):
+        result = self.calculator.evaluate_columns("2 * 3 - 8 / 2 + 5", {})
+        self.assertEqual(list(result), [7])
+
+    def test_evaluate_columns_division_by_zero(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.calculator.evaluate_columns("1 / x", {"x": [1, 0, 2]})
+
+    def test_evaluate_columns_unknown_variable(self):
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate_columns("x + z", {"x": [1, 2]})
+
+    def test_unspaced_expression(self):
+        self.assertEqual(self.calculator.evaluate("3+5*2"), 13)
+
+    def test_parentheses(self):
+        self.assertEqual(self.calculator.evaluate("(2+3)*4"), 20)
+        self.assertEqual(self.calculator.evaluate("2 * (3 - (4 - 1))"), 0)
+
+    def test_unary_minus(self):
+        self.assertEqual(self.calculator.evaluate("-3 + 5"), 2)
+        self.assertEqual(self.calculator.evaluate("2*-3"), -6)
+        self.assertEqual(self.calculator.evaluate("-(2+3)"), -5)
+        self.assertEqual(self.calculator.evaluate("- -4"), 4)
+
+    def test_scientific_notation(self):
+        self.assertEqual(self.calculator.evaluate("1e3 + 2.5E-1"), 1000.25)
+        self.assertEqual(self.calculator.evaluate(".5 * 4"), 2)
+
+    def test_lone_decimal_point(self):
+        with self.assertRaisesRegex(ValueError, "invalid token: \\."):
+            self.calculator.evaluate("3 + .")
+
+    def test_mismatched_parentheses(self):
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("(2 + 3")
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("2 + 3)")
+
+    def test_unary_minus_without_operand(self):
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("3 * -")
+
+
+class TestBatch(unittest.TestCase):
+    def test_evaluate_stream_keeps_order(self):
+        expressions = [f"{i} * 2" for i in range(50)]
+        for workers in (1, 2):
+            results = list(evaluate_stream(expressions, workers=workers, chunk_size=7))
+            self.assertEqual(
+                [result for _, result, _ in results], [i * 2 for i in range(50)]
+            )
+
+    def test_errors_are_reported_per_line(self):
+        lines = ["3 + 5\n", "\n", "1 / 0\n"]
+        results = list(evaluate_stream(read_expressions(lines)))
+        self.assertEqual(results[0], ("3 + 5", 8, None))
+        self.assertEqual(results[1][0], "1 / 0")
+        self.assertIsNotNone(results[1][2])
+
+    def test_csv_format(self):
+        lines = list(format_results([("3 + 5", 8.0, None), ("$", None, "bad")], "csv"))
+        self.assertEqual(lines, ["expression,result,error", "3 + 5,8,", "$,,bad"])
+
 
 if __name__ == "__main__":
     unittest.main()
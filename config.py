@@ -1,16 +1,27 @@
 # Configuration settings for the AI Agent project
+import os
+
+# Directory the agent's tools are confined to, unless main.py is given
+# --working-directory
+WORKING_DIRECTORY = "./calculator"
 
 # File reading limits
 MAX_FILE_READ_BYTES = 10000
+# get_files_content: files per call and bytes shared by all of them
+FILES_CONTENT_MAX_FILES = 50
+FILES_CONTENT_TOTAL_BYTES = 4 * MAX_FILE_READ_BYTES
 SYSTEM_PROMPT = """
 You are a helpful AI coding agent.
 
 When a user asks a question or makes a request, make a function call plan. You can perform the following operations:
 
 - List files and directories
-- Read file contents
+- Read file contents, one file or several at once
 - Execute Python files with optional arguments
+- Run the unittest tests and get a pass/fail summary
 - Write or overwrite files
+- Edit part of a file with search/replace pairs or a unified diff
+- Search file contents for text or a regular expression
 
 Guidelines:
 
@@ -20,3 +31,83 @@ Guidelines:
 - If you are unsure which file the user is talking about, first list the top‑level files/directories, then read any file whose name contains the keyword(s) in the user’s request (e.g. “calc”, “calculator”). Only ask the user if no plausible file exists.
 - Do not ask for confirmation.
 """
+
+# run_python_file limits: seconds before a script is killed, and how many warm
+# interpreters to keep ready (0 starts a fresh interpreter for every run)
+RUN_PYTHON_TIMEOUT = 30
+RUN_PYTHON_WARM_POOL_SIZE = 2
+
+# Bytes of stdout and stderr kept per run (first and last half), and the total
+# output after which a runaway script is killed
+RUN_PYTHON_MAX_OUTPUT_BYTES = 10000
+RUN_PYTHON_KILL_OUTPUT_BYTES = 10 * 1024 * 1024
+
+# A session stops once it has run this many seconds, used this many tokens
+# (prompt plus response, summed over its model calls) or made this many model
+# calls
+SESSION_TIMEOUT = 600
+SESSION_TOKEN_BUDGET = 1_000_000
+SESSION_MAX_ITERATIONS = 50
+
+# Pacing of model requests across all sessions, None to disable a limit
+MODEL_REQUESTS_PER_MINUTE = 60
+MODEL_TOKENS_PER_MINUTE = 1_000_000
+
+# Retries of rate limited (429) and server (5xx) errors, with jittered
+# exponential backoff starting at MODEL_BACKOFF_BASE seconds
+MODEL_MAX_RETRIES = 5
+MODEL_BACKOFF_BASE = 1.0
+MODEL_BACKOFF_MAX = 60.0
+
+# get_files_info listing: names never shown, default depth of recursive
+# listings, entries returned per call and how many full listings are kept so
+# later pages are sliced from them instead of walking the tree again
+FILES_INFO_IGNORE = [".git", "__pycache__", ".venv", "venv", ".agent_cache"]
+FILES_INFO_MAX_DEPTH = 5
+FILES_INFO_PAGE_SIZE = 200
+FILES_INFO_CACHED_LISTINGS = 16
+
+# Flush written files to disk before reporting success. Slower, but survives
+# a crash of the whole machine and not just of the agent
+WRITE_FILE_FSYNC = False
+
+# search_files limits: matches per call, context lines around a match,
+# characters shown per line and size of the largest file searched
+SEARCH_MAX_MATCHES = 100
+SEARCH_MAX_CONTEXT_LINES = 5
+SEARCH_MAX_LINE_LENGTH = 200
+SEARCH_MAX_FILE_BYTES = 1024 * 1024
+
+# Size of the files whose lines search_files keeps in memory between calls;
+# the least recently searched are dropped first
+SEARCH_CACHE_BYTES = 64 * 1024 * 1024
+
+# Upper bound on tool calls from one model turn that may run at the same time
+MAX_PARALLEL_TOOL_CALLS = 8
+
+# run_tests: test file names to discover, and traceback lines kept per problem
+TESTS_PATTERN = "test*.py"
+TESTS_MAX_TRACEBACK_LINES = 12
+
+# Sessions run at once by --batch and --serve
+MAX_CONCURRENT_SESSIONS = 4
+
+# Persistent cache of read-only tool results, set the path to None to disable
+TOOL_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".agent_cache", "tool_cache.sqlite"
+)
+TOOL_CACHE_MAX_BYTES = 50 * 1024 * 1024
+# Most recently used tool results also kept in memory
+TOOL_CACHE_MEMORY_ENTRIES = 512
+
+# Recorded model responses for --model-cache record/replay
+MODEL_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".agent_cache", "responses"
+)
+
+# Once a session's context is estimated above this many tokens, older turns are
+# summarized, keeping the most recent turns verbatim
+CONTEXT_TOKEN_BUDGET = 32000
+CONTEXT_KEEP_RECENT_TURNS = 4
+# Lines kept in that summary; the oldest are dropped first
+CONTEXT_SUMMARY_MAX_LINES = 60
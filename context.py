@@ -0,0 +1,235 @@
+import json
+import os
+
+from google.genai import types
+
+from config import (
+    CONTEXT_KEEP_RECENT_TURNS,
+    CONTEXT_SUMMARY_MAX_LINES,
+    CONTEXT_TOKEN_BUDGET,
+)
+
+# Rough size of a token, used between usage_metadata reports
+CHARS_PER_TOKEN = 4
+
+
+def _tool_path(function_call):
+    path = (function_call.args or {}).get("file_path")
+    return os.path.normpath(path) if path else None
+
+
+def _describe_call(function_call):
+    args = ", ".join(
+        f"{name}={value!r}"
+        for name, value in (function_call.args or {}).items()
+        if name != "content"
+    )
+    return f"{function_call.name}({args})"
+
+
+def _describe_response(response):
+    if "error" in response:
+        return f"error: {response['error']}"
+    result = str(response.get("result", ""))
+    first_line = result.splitlines()[0] if result else ""
+    if len(result) <= 120:
+        return first_line
+    return f"{first_line[:80]} ... ({len(result)} characters)"
+
+
+class ContextManager:
+    # Owns the message history of one session and keeps it within a token
+    # budget: repeated reads and reads made stale by a write are replaced with
+    # stubs, and older turns are folded into a summary once over budget.
+    def __init__(
+        self,
+        prompt,
+        token_budget=CONTEXT_TOKEN_BUDGET,
+        keep_recent_turns=CONTEXT_KEEP_RECENT_TURNS,
+    ):
+        self.messages = [
+            types.Content(role="user", parts=[types.Part(text=prompt)]),
+        ]
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.total_prompt_tokens = 0
+        self.total_response_tokens = 0
+        self.iterations = 0
+        # Why the agent loop gave up on the session, if it did
+        self.stopped = None
+        self._pending_chars = 0
+        self._pending_calls = []
+        self._reads = []
+        # Lines of the one summary message, carried over between compactions
+        self._summary = None
+        self._summary_lines = []
+
+    @property
+    def estimated_tokens(self):
+        return (
+            self.prompt_tokens
+            + self.response_tokens
+            + self._pending_chars // CHARS_PER_TOKEN
+        )
+
+    @property
+    def total_tokens(self):
+        return self.total_prompt_tokens + self.total_response_tokens
+
+    def record_usage(self, usage_metadata):
+        if not usage_metadata:
+            return
+        self.prompt_tokens = usage_metadata.prompt_token_count or 0
+        self.response_tokens = usage_metadata.candidates_token_count or 0
+        self.total_prompt_tokens += self.prompt_tokens
+        self.total_response_tokens += self.response_tokens
+        self._pending_chars = 0
+
+    def add_model_turn(self, content):
+        self.messages.append(content)
+        self._pending_calls = [
+            part.function_call for part in content.parts or [] if part.function_call
+        ]
+
+    def add_tool_results(self, results):
+        for function_call, result in zip(self._pending_calls, results):
+            self.messages.append(result)
+            part = result.parts[0]
+            self._pending_chars += len(json.dumps(part.function_response.response))
+            self._track(function_call, part)
+        self._pending_calls = []
+
+    def _track(self, function_call, part):
+        response = part.function_response.response
+
+        if function_call.name == "get_files_content":
+            # Each file in the result is tracked like a get_file_content read
+            # of the same bytes, and stubbed on its own
+            result = response.get("result")
+            for entry in result.get("files", []) if isinstance(result, dict) else []:
+                if "content" not in entry:
+                    continue
+                args = {}
+                if "next_offset" in entry:
+                    args["length"] = entry["next_offset"]
+                self._add_read(os.path.normpath(entry["path"]), args, part, entry)
+            return
+
+        path = _tool_path(function_call)
+        if path is None:
+            return
+
+        if function_call.name == "get_file_content":
+            args = {
+                name: value
+                for name, value in (function_call.args or {}).items()
+                if name != "file_path"
+            }
+            self._add_read(path, args, part)
+
+        elif function_call.name in ("write_file", "edit_file"):
+            if str(response.get("result", "Error")).startswith("Error"):
+                return  # Nothing changed on disk
+            for read in self._reads:
+                if read["path"] == path:
+                    self._stub(
+                        read,
+                        f'[Stale: "{path}" was changed by {function_call.name} after this read]',
+                    )
+
+    def _add_read(self, path, args, part, entry=None):
+        for read in self._reads:
+            if read["path"] == path and read["args"] == args:
+                self._stub(read, f'[Superseded: "{path}" was read again later]')
+        self._reads.append(
+            {"path": path, "args": args, "part": part, "entry": entry, "stubbed": False}
+        )
+
+    def _stub(self, read, message):
+        if read["stubbed"]:
+            return
+        if read["entry"] is None:
+            read["part"].function_response.response = {"result": message}
+        else:
+            # Only this file's entry in a get_files_content result
+            path = read["entry"]["path"]
+            read["entry"].clear()
+            read["entry"].update(path=path, content=message)
+        read["stubbed"] = True
+
+    def _estimate(self, messages):
+        return (
+            sum(
+                len(json.dumps(message.model_dump(mode="json", exclude_none=True)))
+                for message in messages
+            )
+            // CHARS_PER_TOKEN
+        )
+
+    def compact(self):
+        # Fold everything but the prompt and the most recent turns into a
+        # single summary message, the previous summary included. Turns are cut
+        # at model boundaries so every function call stays next to its
+        # response.
+        if self.estimated_tokens <= self.token_budget:
+            return False
+
+        turn_starts = [
+            index
+            for index, message in enumerate(self.messages)
+            if message.role == "model"
+        ]
+        if len(turn_starts) <= self.keep_recent_turns:
+            return False
+
+        head_end = turn_starts[0]
+        head = [
+            message
+            for message in self.messages[:head_end]
+            if message is not self._summary
+        ]
+        cut = turn_starts[-self.keep_recent_turns] if self.keep_recent_turns else None
+        old = self.messages[head_end:cut]
+        recent = self.messages[cut:] if cut is not None else []
+
+        summary = list(self._summary_lines)
+        calls = []
+        for message in old:
+            for part in message.parts or []:
+                if part.function_call:
+                    calls.append(part.function_call)
+                elif part.function_response and calls:
+                    function_call = calls.pop(0)
+                    summary.append(
+                        f"- {_describe_call(function_call)} -> "
+                        f"{_describe_response(part.function_response.response)}"
+                    )
+                elif part.text and not part.thought and message.role == "model":
+                    summary.append(f"- model: {part.text.strip()[:200]}")
+
+        if len(summary) > CONTEXT_SUMMARY_MAX_LINES:
+            summary = summary[-CONTEXT_SUMMARY_MAX_LINES:]
+        text = "\n".join(["Summary of earlier steps in this session:", *summary])
+        summary_message = types.Content(role="user", parts=[types.Part(text=text)])
+        messages = [*head, summary_message, *recent]
+        # When the recent turns alone are over budget there is nothing left
+        # to fold, so keep the history instead of rewriting it every turn
+        estimate = self._estimate(messages)
+        if estimate >= self._estimate(self.messages):
+            return False
+
+        self.messages = messages
+        self._summary = summary_message
+        self._summary_lines = summary
+        self._reads = [
+            read
+            for read in self._reads
+            if any(read["part"] is part for message in recent for part in message.parts)
+        ]
+        # Re-estimate from the compacted history until the model reports usage
+        self.prompt_tokens = estimate
+        self.response_tokens = 0
+        self._pending_chars = 0
+        return True
@@ -0,0 +1,74 @@
+import asyncio
+
+from config import MAX_PARALLEL_TOOL_CALLS
+from functions.call_function import call_function
+from functions.sandbox import normalize_path, paths_overlap
+
+# How each tool touches the working directory: (mode, argument holding the path).
+# A None argument means the tool touches the whole tree. Tools missing from
+# this table are treated as writing everything, so they always run alone.
+TOOL_ACCESS = {
+    "get_files_info": ("read", "directory"),
+    "get_file_content": ("read", "file_path"),
+    "get_files_content": ("read", None),
+    "run_python_file": ("read", None),
+    "run_tests": ("read", None),
+    "write_file": ("write", "file_path"),
+    "edit_file": ("write", "file_path"),
+    "search_files": ("read", "directory"),
+}
+
+
+def _access(function_call):
+    mode, arg = TOOL_ACCESS.get(function_call.name, ("write", None))
+    path = "."
+    if arg is not None:
+        path = normalize_path((function_call.args or {}).get(arg))
+    return mode, path
+
+
+def _conflicts(first, second):
+    first_mode, first_path = first
+    second_mode, second_path = second
+    if first_mode == "read" and second_mode == "read":
+        return False
+    return paths_overlap(first_path, second_path)
+
+
+class AsyncDispatcher:
+    # Starts each tool call as soon as it is submitted, e.g. while the rest of
+    # a streamed model response is still arriving. A call waits only for the
+    # earlier calls it conflicts with.
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self._accesses = []
+        self._tasks = []
+        self._semaphore = asyncio.Semaphore(MAX_PARALLEL_TOOL_CALLS)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def submit(self, function_call):
+        access = _access(function_call)
+        blockers = [
+            task
+            for earlier, task in zip(self._accesses, self._tasks)
+            if _conflicts(earlier, access)
+        ]
+        self._accesses.append(access)
+        self._tasks.append(asyncio.create_task(self._run(function_call, blockers)))
+
+    async def _run(self, function_call, blockers):
+        if blockers:
+            await asyncio.wait(blockers)
+        async with self._semaphore:
+            return await asyncio.to_thread(
+                call_function, function_call, verbose=self.verbose
+            )
+
+    async def results(self):
+        return await asyncio.gather(*self._tasks)
+
+    async def drain(self):
+        # Let calls that already started finish before giving up on a turn
+        await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import random
+import weakref
+from types import SimpleNamespace
+
+from google.genai import errors, types
+
+from context import CHARS_PER_TOKEN
+
+# Explores the calculator with read-only tools, then answers. Read-only so
+# that hundreds of sessions can run against the real working directory.
+DEFAULT_SCRIPT = {
+    "latency": 0.05,
+    "turns": [
+        [{"function_call": {"name": "get_files_info", "args": {"directory": "."}}}],
+        [
+            {"text": "Reading the calculator sources."},
+            {
+                "function_call": {
+                    "name": "get_file_content",
+                    "args": {"file_path": "pkg/calculator.py"},
+                }
+            },
+            {
+                "function_call": {
+                    "name": "search_files",
+                    "args": {"pattern": "def ", "file_pattern": "*.py"},
+                }
+            },
+        ],
+        [
+            {"text": "The calculator compiles infix expressions to postfix code "},
+            {"text": "and evaluates it with a stack."},
+        ],
+    ],
+}
+
+
+class FakeClient:
+    # Stands in for genai.Client without the network. The reply to a request
+    # is the script turn matching the number of turns already answered in the
+    # conversation, so every session walks through the same script; once the
+    # script runs out the model answers "Done.". A conversation is recognized
+    # by its first message, the prompt, which context compaction keeps, so
+    # folding turns into a summary does not replay them. A turn is a list of
+    # parts, {"text": ...} or {"function_call": {"name": ..., "args": ...}},
+    # streamed one chunk per part, or {"error": <HTTP status>} to fail the
+    # request.
+    # latency is the seconds before the first chunk (give or take jitter, a
+    # fraction of it) and chunk_latency the seconds between chunks. With an
+    # error_rate, that share of requests fails with a 429 at random. Token
+    # counts are estimated from the size of the request and the reply.
+    def __init__(
+        self,
+        turns,
+        latency=0.0,
+        jitter=0.0,
+        chunk_latency=0.0,
+        error_rate=0.0,
+        seed=None,
+    ):
+        self.turns = turns
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_latency = chunk_latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        # id of a conversation's first message -> (weak reference, turns answered)
+        self._conversations = {}
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(generate_content_stream=self.generate_content_stream)
+        )
+
+    @classmethod
+    def from_script(cls, path=None, **overrides):
+        # A script file holds {"turns": [...], "latency": ..., ...} or just
+        # the list of turns
+        script = DEFAULT_SCRIPT
+        if path:
+            with open(path, encoding="utf-8") as file:
+                script = json.load(file)
+        if isinstance(script, list):
+            script = {"turns": script}
+        settings = {
+            name: script[name]
+            for name in ("latency", "jitter", "chunk_latency", "error_rate", "seed")
+            if name in script
+        }
+        settings.update(overrides)
+        return cls(script["turns"], **settings)
+
+    def _answered(self, contents):
+        first = contents[0]
+        entry = self._conversations.get(id(first))
+        if entry and entry[0]() is first:
+            return entry[1]
+        # A conversation new to this client, possibly with earlier turns
+        return sum(1 for content in contents if content.role == "model")
+
+    def _advance(self, contents, index):
+        key = id(contents[0])
+        reference = weakref.ref(
+            contents[0], lambda _: self._conversations.pop(key, None)
+        )
+        self._conversations[key] = (reference, index + 1)
+
+    def _turn(self, contents):
+        self.requests += 1
+        index = self._answered(contents)
+        if index < len(self.turns):
+            turn = self.turns[index]
+        else:
+            turn = [{"text": "Done."}]
+        if self.error_rate and self.random.random() < self.error_rate:
+            turn = {"error": 429}
+        if isinstance(turn, dict) and "error" in turn:
+            code = turn["error"]
+            response = {"error": {"code": code, "message": "fake model error"}}
+            if code >= 500:
+                raise errors.ServerError(code, response)
+            raise errors.ClientError(code, response)
+        # Failed requests are retried with the same turn
+        self._advance(contents, index)
+        return turn
+
+    def _chunks(self, contents, turn):
+        prompt_tokens = (
+            sum(len(content.model_dump_json(exclude_none=True)) for content in contents)
+            // CHARS_PER_TOKEN
+        )
+        chunks = []
+        response_tokens = 0
+        for part in turn:
+            if "function_call" in part:
+                chunk_part = types.Part(
+                    function_call=types.FunctionCall(**part["function_call"])
+                )
+                response_tokens += len(json.dumps(part["function_call"]))
+            else:
+                chunk_part = types.Part(text=part.get("text", ""))
+                response_tokens += len(chunk_part.text)
+            chunks.append(
+                types.GenerateContentResponse(
+                    candidates=[
+                        types.Candidate(
+                            content=types.Content(role="model", parts=[chunk_part])
+                        )
+                    ]
+                )
+            )
+        response_tokens //= CHARS_PER_TOKEN
+        # Like the real API, usage arrives with the last chunk
+        chunks[-1].usage_metadata = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=response_tokens,
+            total_token_count=prompt_tokens + response_tokens,
+        )
+        return chunks
+
+    def _delay(self):
+        spread = self.latency * self.jitter
+        return max(0.0, self.latency + self.random.uniform(-spread, spread))
+
+    async def generate_content_stream(self, *, model, contents, config=None):
+        chunks = self._chunks(contents, self._turn(contents))
+        await asyncio.sleep(self._delay())
+        return self._stream(chunks)
+
+    async def _stream(self, chunks):
+        for number, chunk in enumerate(chunks):
+            if number and self.chunk_latency:
+                await asyncio.sleep(self.chunk_latency)
+            yield chunk
@@ -0,0 +1,122 @@
+import sys
+from functools import cache
+
+from google.genai import types
+
+from config import TOOL_CACHE_MAX_BYTES, TOOL_CACHE_MEMORY_ENTRIES, TOOL_CACHE_PATH
+from functions.edit_file import edit_file
+from functions.file_index import get_file_index
+from functions.get_file_content import get_file_content
+from functions.get_files_content import get_files_content
+from functions.get_files_info import get_files_info
+from functions.run_python import run_python_file
+from functions.run_tests import run_tests
+from functions.sandbox import get_sandbox
+from functions.search_files import search_files
+from functions.tool_cache import ToolCache
+from functions.write_file import add_write_listener, write_file
+from tracing import tracer
+
+functions = {
+    "get_files_info": get_files_info,
+    "get_file_content": get_file_content,
+    "get_files_content": get_files_content,
+    "run_python_file": run_python_file,
+    "run_tests": run_tests,
+    "write_file": write_file,
+    "edit_file": edit_file,
+    "search_files": search_files,
+}
+
+
+@cache
+def get_available_functions():
+    # Every tool module defines schema_<tool name>; the schemas are built on
+    # first lookup, so the tool list is assembled here once and then shared
+    return types.Tool(
+        function_declarations=[
+            getattr(sys.modules[function.__module__], f"schema_{name}")
+            for name, function in functions.items()
+        ]
+    )
+
+
+tool_cache = None
+if TOOL_CACHE_PATH:
+    tool_cache = ToolCache(
+        TOOL_CACHE_PATH, TOOL_CACHE_MAX_BYTES, TOOL_CACHE_MEMORY_ENTRIES
+    )
+    add_write_listener(tool_cache.invalidate)
+
+
+def call_function(function_call_part, verbose=False):
+    if verbose:
+        print(f"Calling function: {function_call_part.name}({function_call_part.args})")
+    else:
+        print(f" - Calling function: {function_call_part.name}")
+
+    function_name = function_call_part.name
+
+    function = functions.get(function_name)
+
+    if not function:
+        return types.Content(
+            role="tool",
+            parts=[
+                types.Part.from_function_response(
+                    name=function_name,
+                    response={"error": f"Unknown function: {function_name}"},
+                )
+            ],
+        )
+
+    with tracer.span("tool", function_name) as span:
+        try:
+            args = dict(function_call_part.args or {})
+            # The workspace root, resolved and opened once per run
+            sandbox = get_sandbox()
+            working_directory = sandbox.root
+            cache_key = tool_cache and tool_cache.key(
+                function_name, working_directory, args
+            )
+            function_result = cache_key and tool_cache.get(cache_key)
+            span["cache_hit"] = function_result is not None
+            if function_result is None:
+                function_result = function(working_directory=working_directory, **args)
+                if cache_key:
+                    tool_cache.put(cache_key, function_result)
+                if function_name == "run_python_file":
+                    # Scripts may change any file or symlink without the index
+                    # or the sandbox hearing about it
+                    get_file_index(working_directory).clear()
+                    sandbox.clear()
+            elif verbose:
+                print(f"Cache hit for {function_name}")
+            span["bytes"] = len(str(function_result))
+            if str(function_result).startswith("Error"):
+                span["error"] = function_result
+            if verbose:
+                print(f"Function result: {function_result}")
+            return types.Content(
+                role="tool",
+                parts=[
+                    types.Part.from_function_response(
+                        name=function_name,
+                        response={"result": function_result},
+                    )
+                ],
+            )
+        except Exception as e:
+            error_message = f"Error calling function {function_name}: {str(e)}"
+            span["error"] = error_message
+            if verbose:
+                print(error_message)
+            return types.Content(
+                role="tool",
+                parts=[
+                    types.Part.from_function_response(
+                        name=function_name,
+                        response={"error": error_message},
+                    )
+                ],
+            )
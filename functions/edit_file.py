@@ -0,0 +1,212 @@
+import os
+import re
+import sys
+
+# Add the parent directory to Python path so we can import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.sandbox import get_sandbox
+from functions.schema import lazy_schema
+from functions.write_file import (
+    atomic_write,
+    changed_bytes,
+    notify_write_listeners,
+    read_regular_file,
+)
+
+
+def _schema(types):
+    return types.FunctionDeclaration(
+        name="edit_file",
+        description="Change part of an existing file in the working directory without resending the whole file. Give either edits (search/replace pairs, each old_text must appear exactly once in the file) or diff (a unified diff against the file). All changes are applied together, or none are if any fails. Use write_file to create new files or replace a file entirely.",
+        parameters=types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                "file_path": types.Schema(
+                    type=types.Type.STRING,
+                    description="The path to the file to edit, relative to the working directory. If not provided, cause an error.",
+                ),
+                "edits": types.Schema(
+                    type=types.Type.ARRAY,
+                    items=types.Schema(
+                        type=types.Type.OBJECT,
+                        properties={
+                            "old_text": types.Schema(
+                                type=types.Type.STRING,
+                                description="Exact text to replace, including enough surrounding lines to be unique.",
+                            ),
+                            "new_text": types.Schema(
+                                type=types.Type.STRING,
+                                description="Text to put in its place.",
+                            ),
+                        },
+                    ),
+                    description="Search/replace pairs applied in order.",
+                ),
+                "diff": types.Schema(
+                    type=types.Type.STRING,
+                    description="Unified diff (@@ hunks with ' ', '-' and '+' lines) to apply to the file.",
+                ),
+            },
+        ),
+    )
+
+
+__getattr__ = lazy_schema(__name__, "schema_edit_file", _schema)
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+
+def apply_edits(text, edits):
+    for number, edit in enumerate(edits, start=1):
+        old_text = edit.get("old_text") or ""
+        new_text = edit.get("new_text") or ""
+        if not old_text:
+            raise ValueError(f"edit {number} has an empty old_text")
+        count = text.count(old_text)
+        if count != 1:
+            where = "not found" if count == 0 else f"found {count} times"
+            raise ValueError(
+                f"edit {number}: old_text {where}, it must match exactly once"
+            )
+        text = text.replace(old_text, new_text, 1)
+    return text
+
+
+def _parse_hunks(diff):
+    # Each hunk keeps its lines in order as (op, text), op being " ", "-" or
+    # "+". Lines are split on "\n" only, like the file they apply to. A
+    # "\ No newline at end of file" marker applies to the line before it, so
+    # it is recorded for the old side, the new side or both.
+    hunks = []
+    hunk = None
+    lines = diff.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    for line in lines:
+        line = line.removesuffix("\r")
+        header = _HUNK_HEADER.match(line)
+        if header:
+            hunk = {
+                "start": int(header.group(1)),
+                "lines": [],
+                "old_missing_newline": False,
+                "new_missing_newline": False,
+            }
+            hunks.append(hunk)
+        elif hunk is None or line.startswith(("---", "+++")):
+            continue  # File headers and anything before the first hunk
+        elif line == "":
+            hunk["lines"].append((" ", ""))
+        elif line[0] in " -+":
+            hunk["lines"].append((line[0], line[1:]))
+        elif line.startswith("\\"):
+            if hunk["lines"]:
+                op = hunk["lines"][-1][0]
+                hunk["old_missing_newline"] |= op != "+"
+                hunk["new_missing_newline"] |= op != "-"
+        else:
+            raise ValueError(f"unexpected line in diff: {line!r}")
+    if not hunks:
+        raise ValueError("diff has no @@ hunks")
+    return hunks
+
+
+def _split_lines(text):
+    # Lines with their endings; "\r\n" stays with its line and other
+    # characters str.splitlines would break on (form feeds, ...) stay inside
+    parts = text.split("\n")
+    lines = [part + "\n" for part in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1])
+    return lines
+
+
+def _bare(line):
+    return line.removesuffix("\n").removesuffix("\r")
+
+
+def apply_diff(text, diff):
+    # Hunks are located by their content, starting at the line the header
+    # names and searching outwards, so line numbers that are slightly off
+    # still apply. Lines the diff leaves alone keep their exact bytes, and
+    # added lines take the file's line ending.
+    lines = _split_lines(text)
+    newline = "\r\n" if lines and lines[0].endswith("\r\n") else "\n"
+    # Give a last line without newline one while editing. It is taken off
+    # again at the end unless a hunk's "\ No newline" markers say otherwise.
+    missing_newline = bool(lines) and not lines[-1].endswith("\n")
+    if missing_newline:
+        lines[-1] += newline
+    shift = 0
+    for number, hunk in enumerate(_parse_hunks(diff), start=1):
+        old = [line for op, line in hunk["lines"] if op != "+"]
+        expected = max(hunk["start"] - 1 + shift, 0)
+        candidates = sorted(
+            range(len(lines) - len(old) + 1), key=lambda start: abs(start - expected)
+        )
+        for start in candidates:
+            if [_bare(line) for line in lines[start : start + len(old)]] == old:
+                break
+        else:
+            raise ValueError(f"hunk {number} does not match the file")
+
+        matched = iter(lines[start : start + len(old)])
+        new = []
+        for op, line in hunk["lines"]:
+            if op == " ":
+                new.append(next(matched))
+            elif op == "-":
+                next(matched)
+            else:
+                new.append(line + newline)
+        lines[start : start + len(old)] = new
+        shift += len(new) - len(old)
+        if hunk["new_missing_newline"]:
+            missing_newline = True
+        elif hunk["old_missing_newline"]:
+            missing_newline = False
+    text = "".join(lines)
+    if missing_newline:
+        text = text.removesuffix(newline)
+    return text
+
+
+def edit_file(working_directory, file_path, edits=None, diff=None):
+    try:
+        sandbox = get_sandbox(working_directory)
+        relative = sandbox.relative(file_path)
+
+        if relative is None:
+            return f'Error: Cannot edit "{file_path}" as it is outside the permitted working directory'
+        if bool(edits) == bool(diff):
+            return f'Error: editing "{file_path}" needs exactly one of edits or diff'
+
+        try:
+            directory, name = sandbox.parent(relative)
+        except FileNotFoundError:
+            return f'Error: File not found or is not a regular file: "{file_path}"'
+        try:
+            old_data = read_regular_file(directory, name)
+            if old_data is None:
+                return f'Error: File not found or is not a regular file: "{file_path}"'
+            text = old_data.decode("utf-8")
+
+            try:
+                text = apply_edits(text, edits) if edits else apply_diff(text, diff)
+            except ValueError as e:
+                return f'Error: could not edit "{file_path}": {e}. The file was not changed.'
+
+            new_data = text.encode("utf-8")
+            if new_data == old_data:
+                return f'No changes made to "{file_path}"'
+
+            atomic_write(directory, name, new_data)
+        finally:
+            os.close(directory)
+        notify_write_listeners(working_directory, relative)
+
+        return f'Successfully edited "{file_path}" ({changed_bytes(old_data, new_data)} bytes changed, {len(new_data)} bytes total)'
+
+    except Exception as e:
+        return f'Error: editing file "{file_path}": {e}'
@@ -0,0 +1,159 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from fnmatch import fnmatch
+from pathlib import Path
+
+# Add the parent directory to Python path so we can import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import FILES_INFO_CACHED_LISTINGS
+from functions.sandbox import get_sandbox
+from functions.write_file import add_write_listener
+
+
+class FileIndex:
+    # In-memory listing of every directory visited under one root. A directory
+    # is rescanned only when its mtime changes (entries added or removed) or
+    # when a write inside it is reported. Only names and types are kept:
+    # sizes change without touching the directory mtime, so callers that show
+    # them stat the entries they return.
+    def __init__(self, root):
+        self.root = Path(root).resolve()
+        self._directories = {}
+        self._listings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def entries(self, directory="."):
+        # Returns sorted (name, is_dir, is_symlink) tuples
+        return self._scan(os.path.normpath(directory))[1]
+
+    def _scan(self, directory):
+        path = self.root / directory
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._directories.get(directory)
+        if cached and cached[0] == mtime:
+            return cached
+
+        entries = []
+        with os.scandir(path) as scan:
+            for entry in scan:
+                try:
+                    entry.stat()
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue  # Broken symlink or entry removed during the scan
+                entries.append((entry.name, is_dir, entry.is_symlink()))
+        entries.sort()
+        with self._lock:
+            self._directories[directory] = (mtime, entries)
+        return mtime, entries
+
+    def walk(self, directory=".", max_depth=None, ignore=(), visited=None):
+        # Yields (relative path, is_dir) one directory at a time, paths
+        # relative to directory. The mtime of every directory listed is
+        # recorded in visited when given.
+        # Symlinked directories are listed but never entered.
+        stack = [(os.path.normpath(directory), "", 1)]
+        while stack:
+            current, prefix, depth = stack.pop()
+            mtime, entries = self._scan(current)
+            if visited is not None:
+                visited[current] = mtime
+            children = []
+            for name, is_dir, is_symlink in entries:
+                if _ignored(name, ignore):
+                    continue
+                relative = os.path.join(prefix, name)
+                yield relative, is_dir
+                if (
+                    is_dir
+                    and not is_symlink
+                    and (max_depth is None or depth < max_depth)
+                ):
+                    children.append((os.path.join(current, name), relative, depth + 1))
+            stack.extend(reversed(children))
+
+    def listing(self, directory=".", max_depth=None, ignore=(), pattern=None):
+        # The whole walk as a list, optionally keeping only entries whose name
+        # or relative path matches pattern. Kept for FILES_INFO_CACHED_LISTINGS
+        # recent arguments and reused while no directory in it has changed,
+        # which costs one stat per directory instead of a walk.
+        directory = os.path.normpath(directory)
+        key = (directory, max_depth, tuple(ignore), pattern)
+        with self._lock:
+            cached = self._listings.get(key)
+        root = str(self.root)
+        if cached and all(
+            _mtime(os.path.join(root, path)) == mtime
+            for path, mtime in cached[0].items()
+        ):
+            with self._lock:
+                if key in self._listings:
+                    self._listings.move_to_end(key)
+            return cached[1]
+
+        visited = {}
+        entries = [
+            (path, is_dir)
+            for path, is_dir in self.walk(directory, max_depth, ignore, visited)
+            if not pattern
+            or fnmatch(os.path.basename(path), pattern)
+            or fnmatch(path, pattern)
+        ]
+        with self._lock:
+            self._listings[key] = (visited, entries)
+            self._listings.move_to_end(key)
+            while len(self._listings) > FILES_INFO_CACHED_LISTINGS:
+                self._listings.popitem(last=False)
+        return entries
+
+    def invalidate(self, path):
+        # Directory mtimes can be too coarse to show a write made right
+        # after a scan
+        parent = os.path.dirname(os.path.normpath(path)) or "."
+        with self._lock:
+            self._directories.pop(parent, None)
+            for key, (visited, _) in list(self._listings.items()):
+                if parent in visited:
+                    del self._listings[key]
+
+    def clear(self):
+        with self._lock:
+            self._directories.clear()
+            self._listings.clear()
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _ignored(name, patterns):
+    return any(fnmatch(name, pattern) for pattern in patterns)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_file_index(working_directory):
+    root = get_sandbox(working_directory).root
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = FileIndex(root)
+    return index
+
+
+def _invalidate_on_write(working_directory, file_path):
+    index = _indexes.get(get_sandbox(working_directory).root)
+    if index:
+        index.invalidate(file_path)
+
+
+add_write_listener(_invalidate_on_write)
@@ -1,49 +1,159 @@
 import os
+import stat
 import sys
-from pathlib import Path
-
-from google.genai import types
 
 # Add the parent directory to Python path so we can import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import MAX_FILE_READ_BYTES
+from functions.sandbox import get_sandbox
+from functions.schema import lazy_schema
 
-schema_get_file_content = types.FunctionDeclaration(
-    name="get_file_content",
-    description="Read file content in the specified directory, constrained to the working directory, if file size more than 10000 bytes, file will be truncated with a message in the end of the file.",
-    parameters=types.Schema(
-        type=types.Type.OBJECT,
-        properties={
-            "file_path": types.Schema(
-                type=types.Type.STRING,
-                description="file name to load content from, inside the working directory. file_path is mandatory. If not provided, cause an error.",
-            ),
-        },
-    ),
-)
-
-
-def get_file_content(working_directory, file_path):
-    full_path = os.path.join(working_directory, file_path)
-
-    if not os.path.isfile(full_path):
-        return f'Error: File not found or is not a regular file: "{file_path}"'
 
-    working_directory = Path(working_directory).resolve()
-    full_path = Path(full_path).resolve()
+def _schema(types):
+    return types.FunctionDeclaration(
+        name="get_file_content",
+        description=f"Read file content in the specified directory, constrained to the working directory. At most {MAX_FILE_READ_BYTES} bytes are returned per call; if more of the file remains, the result ends with a note giving next_offset, which can be passed as offset to read the following part. A range can be selected with offset/length (bytes) or start_line/end_line (1-based, inclusive).",
+        parameters=types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                "file_path": types.Schema(
+                    type=types.Type.STRING,
+                    description="file name to load content from, inside the working directory. file_path is mandatory. If not provided, cause an error.",
+                ),
+                "offset": types.Schema(
+                    type=types.Type.INTEGER,
+                    description="Byte offset to start reading from. Defaults to 0. Ignored when start_line or end_line is given.",
+                ),
+                "length": types.Schema(
+                    type=types.Type.INTEGER,
+                    description=f"Maximum number of bytes to read. Defaults to and is capped at {MAX_FILE_READ_BYTES}.",
+                ),
+                "start_line": types.Schema(
+                    type=types.Type.INTEGER,
+                    description="First line to read, 1-based. Defaults to 1 when end_line is given.",
+                ),
+                "end_line": types.Schema(
+                    type=types.Type.INTEGER,
+                    description="Last line to read, inclusive. Defaults to the end of the file.",
+                ),
+            },
+        ),
+    )
+
+
+__getattr__ = lazy_schema(__name__, "schema_get_file_content", _schema)
+
+
+def _complete_characters(data):
+    # Drop a UTF-8 character cut in half at the end of a read, so the next
+    # read starts on a character boundary
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 == 0x80:
+            continue  # continuation byte, keep looking for the first byte
+        if byte < 0x80:
+            needed = 1
+        elif byte < 0xE0:
+            needed = 2
+        elif byte < 0xF0:
+            needed = 3
+        else:
+            needed = 4
+        return data if needed <= back else data[:-back]
+    return data
+
+
+def read_file_range(file, offset, limit):
+    file.seek(offset)
+    data = file.read(limit)
+    if len(data) == limit:
+        data = _complete_characters(data)
+    return data, offset, offset + len(data)
+
+
+def _read_lines(file, start_line, end_line, limit):
+    # Skip to the first requested line without holding more than a chunk
+    line_number = 1
+    position = 0
+    while line_number < start_line:
+        chunk = file.readline(65536)
+        if not chunk:
+            break
+        position += len(chunk)
+        if chunk.endswith(b"\n"):
+            line_number += 1
+
+    start = position
+    data = bytearray()
+    while (end_line is None or line_number <= end_line) and len(data) < limit:
+        chunk = file.readline(limit - len(data))
+        if not chunk:
+            break
+        data += chunk
+        position += len(chunk)
+        if chunk.endswith(b"\n"):
+            line_number += 1
 
-    if not full_path.is_relative_to(working_directory):
+    data = bytes(data)
+    if len(data) == limit:
+        data = _complete_characters(data)
+    return data, start, start + len(data)
+
+
+def get_file_content(
+    working_directory,
+    file_path,
+    offset=0,
+    length=None,
+    start_line=None,
+    end_line=None,
+):
+    sandbox = get_sandbox(working_directory)
+    relative = sandbox.relative(file_path)
+
+    if relative is None:
         return f'Error: Cannot read "{file_path}" as it is outside the permitted working directory'
 
     try:
-        file_size = full_path.stat().st_size
-        with open(full_path, "r", encoding="utf-8") as file:
-            content = file.read(
-                MAX_FILE_READ_BYTES
-            )  # Read up to MAX_FILE_READ_BYTES characters
-        if file_size > MAX_FILE_READ_BYTES:
-            content += f'\n[...File "{full_path}" truncated at {MAX_FILE_READ_BYTES} characters]'
+        descriptor = sandbox.open(relative)
+    except OSError:
+        return f'Error: File not found or is not a regular file: "{file_path}"'
+
+    with os.fdopen(descriptor, "rb") as file:
+        file_stat = os.fstat(descriptor)
+        if not stat.S_ISREG(file_stat.st_mode):
+            return f'Error: File not found or is not a regular file: "{file_path}"'
+        return _read_content(
+            file, file_path, file_stat.st_size, offset, length, start_line, end_line
+        )
+
+
+def _read_content(file, file_path, file_size, offset, length, start_line, end_line):
+    try:
+        offset = int(offset or 0)
+        limit = MAX_FILE_READ_BYTES
+        if length is not None:
+            limit = min(int(length), MAX_FILE_READ_BYTES)
+        if offset < 0:
+            return f'Error: offset must not be negative for "{file_path}"'
+        # A zero-byte read would point next_offset back at the same offset
+        if limit <= 0:
+            return f'Error: length must be positive for "{file_path}"'
+
+        if start_line is not None or end_line is not None:
+            data, start, end = _read_lines(
+                file,
+                int(start_line or 1),
+                None if end_line is None else int(end_line),
+                limit,
+            )
+        else:
+            data, start, end = read_file_range(file, offset, limit)
+
+        content = data.decode("utf-8", errors="replace")
+        if end < file_size:
+            content += f'\n[...File "{file_path}" continues: read bytes {start}-{end} of {file_size}, next_offset={end}]'
         return content
     except Exception as e:
         return f'Error: reading file "{file_path}": {e}'
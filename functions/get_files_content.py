@@ -0,0 +1,110 @@
+import os
+import stat
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+
+# Add the parent directory to Python path so we can import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    FILES_CONTENT_MAX_FILES,
+    FILES_CONTENT_TOTAL_BYTES,
+    FILES_INFO_IGNORE,
+    MAX_FILE_READ_BYTES,
+)
+from functions.file_index import get_file_index
+from functions.get_file_content import read_file_range
+from functions.sandbox import get_sandbox
+from functions.schema import lazy_schema
+
+
+def _schema(types):
+    return types.FunctionDeclaration(
+        name="get_files_content",
+        description=f"Read several files in one call, constrained to the working directory. Give file_paths, a glob pattern, or both. Returns a list with each file's path, size and content. Each file is capped at {MAX_FILE_READ_BYTES} bytes and all files together at {FILES_CONTENT_TOTAL_BYTES} bytes; a truncated file has next_offset set (continue with get_file_content), and files that did not fit at all are listed under omitted.",
+        parameters=types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                "file_paths": types.Schema(
+                    type=types.Type.ARRAY,
+                    items=types.Schema(type=types.Type.STRING),
+                    description="Paths of the files to read, relative to the working directory.",
+                ),
+                "pattern": types.Schema(
+                    type=types.Type.STRING,
+                    description="Glob matched against paths relative to the working directory, e.g. 'pkg/*.py'. '*' also matches '/', so '*.py' selects every Python file.",
+                ),
+            },
+        ),
+    )
+
+
+__getattr__ = lazy_schema(__name__, "schema_get_files_content", _schema)
+
+
+def _read(descriptor, limit):
+    with os.fdopen(descriptor, "rb") as file:
+        data, _, end = read_file_range(file, 0, limit)
+    return data.decode("utf-8", errors="replace"), end
+
+
+def get_files_content(working_directory, file_paths=None, pattern=None):
+    if not file_paths and not pattern:
+        return "Error: get_files_content needs file_paths or pattern"
+
+    sandbox = get_sandbox(working_directory)
+
+    paths = list(dict.fromkeys(file_paths or []))
+    if pattern:
+        for path, is_dir in get_file_index(sandbox.root).walk(ignore=FILES_INFO_IGNORE):
+            if not is_dir and fnmatch(path, pattern) and path not in paths:
+                paths.append(path)
+    if len(paths) > FILES_CONTENT_MAX_FILES:
+        return f"Error: {len(paths)} files requested, at most {FILES_CONTENT_MAX_FILES} can be read in one call"
+
+    files = []
+    reads = []
+    omitted = []
+    budget = FILES_CONTENT_TOTAL_BYTES
+    for path in paths:
+        relative = sandbox.relative(path)
+        if relative is None:
+            files.append(
+                {"path": path, "error": "outside the permitted working directory"}
+            )
+            continue
+        try:
+            descriptor = sandbox.open(relative)
+        except OSError:
+            files.append({"path": path, "error": "file not found"})
+            continue
+        file_stat = os.fstat(descriptor)
+        size = file_stat.st_size
+        if not stat.S_ISREG(file_stat.st_mode):
+            os.close(descriptor)
+            files.append({"path": path, "error": "not a regular file"})
+            continue
+
+        # Budget is handed out in request order before any reading starts
+        limit = min(size, MAX_FILE_READ_BYTES, budget)
+        if size and not limit:
+            os.close(descriptor)
+            omitted.append(path)
+            continue
+        budget -= limit
+        entry = {"path": path, "size": size}
+        files.append(entry)
+        reads.append((entry, descriptor, limit))
+
+    with ThreadPoolExecutor(max_workers=min(8, len(reads) or 1)) as executor:
+        results = executor.map(lambda read: _read(read[1], read[2]), reads)
+        for (entry, _, _), (content, end) in zip(reads, results):
+            entry["content"] = content
+            if end < entry["size"]:
+                entry["next_offset"] = end
+
+    result = {"files": files}
+    if omitted:
+        result["omitted"] = omitted
+    return result
@@ -1,42 +1,101 @@
 import os
-from pathlib import Path
-
-from google.genai import types
-
-schema_get_files_info = types.FunctionDeclaration(
-    name="get_files_info",
-    description="Lists files in the specified directory along with their sizes, constrained to the working directory.",
-    parameters=types.Schema(
-        type=types.Type.OBJECT,
-        properties={
-            "directory": types.Schema(
-                type=types.Type.STRING,
-                description="The directory to list files from, relative to the working directory. If not provided, lists files in the working directory itself.",
-            ),
-        },
-    ),
-)
-
-
-def get_files_info(working_directory, directory=None):
-    if directory is None:
-        return f'Error: "{directory}" is not a directory'
+import sys
+
+# Add the parent directory to Python path so we can import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import FILES_INFO_IGNORE, FILES_INFO_MAX_DEPTH, FILES_INFO_PAGE_SIZE
+from functions.file_index import get_file_index
+from functions.sandbox import get_sandbox
+from functions.schema import lazy_schema
+
+
+def _schema(types):
+    return types.FunctionDeclaration(
+        name="get_files_info",
+        description=f"Lists files in the specified directory along with their sizes, constrained to the working directory. Set recursive to list the whole tree below the directory in one call. {', '.join(FILES_INFO_IGNORE)} are skipped. At most {FILES_INFO_PAGE_SIZE} entries are returned per call; if more remain, the result ends with the offset to pass to get the next page.",
+        parameters=types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                "directory": types.Schema(
+                    type=types.Type.STRING,
+                    description="The directory to list files from, relative to the working directory. If not provided, lists files in the working directory itself.",
+                ),
+                "recursive": types.Schema(
+                    type=types.Type.BOOLEAN,
+                    description="List subdirectories too. Entries are shown with their path relative to directory.",
+                ),
+                "max_depth": types.Schema(
+                    type=types.Type.INTEGER,
+                    description=f"How many directory levels to list when recursive, 1 being the directory itself. Defaults to {FILES_INFO_MAX_DEPTH}.",
+                ),
+                "pattern": types.Schema(
+                    type=types.Type.STRING,
+                    description="Only show entries whose name or relative path matches this glob, e.g. '*.py'.",
+                ),
+                "ignore": types.Schema(
+                    type=types.Type.ARRAY,
+                    items=types.Schema(type=types.Type.STRING),
+                    description="Extra glob patterns for names to skip, in addition to the defaults.",
+                ),
+                "offset": types.Schema(
+                    type=types.Type.INTEGER,
+                    description="Number of entries to skip, for fetching the next page.",
+                ),
+            },
+        ),
+    )
 
-    full_path = os.path.join(working_directory, directory)
 
-    if not os.path.isdir(full_path):
+__getattr__ = lazy_schema(__name__, "schema_get_files_info", _schema)
+
+
+def get_files_info(
+    working_directory,
+    directory=None,
+    recursive=False,
+    max_depth=None,
+    pattern=None,
+    ignore=None,
+    offset=0,
+):
+    if directory is None:
         return f'Error: "{directory}" is not a directory'
 
-    working_directory = Path(working_directory).resolve()
-    full_path = Path(full_path).resolve()
+    sandbox = get_sandbox(working_directory)
+    relative_directory = sandbox.relative(directory)
 
-    if not full_path.is_relative_to(working_directory):
+    if relative_directory is None:
         return f'Error: Cannot list "{directory}" as it is outside the permitted working directory'
+    if not sandbox.path(relative_directory).is_dir():
+        return f'Error: "{directory}" is not a directory'
 
-    content_of_directory = []
+    index = get_file_index(working_directory)
+    max_depth = int(max_depth or FILES_INFO_MAX_DEPTH) if recursive else 1
+    offset = int(offset or 0)
+    listing = index.listing(
+        relative_directory,
+        max_depth=max_depth,
+        ignore=[*FILES_INFO_IGNORE, *(ignore or [])],
+        pattern=pattern,
+    )
 
-    for item in full_path.iterdir():
-        item_info = f"{item.name}: file_size={item.stat().st_size} bytes, is_dir={'True' if item.is_dir() else 'False'}"
+    # Sizes are not in the index, so only the entries shown are statted
+    content_of_directory = []
+    for path, is_dir in listing[offset : offset + FILES_INFO_PAGE_SIZE]:
+        try:
+            size = os.stat(
+                os.path.join(relative_directory, path), dir_fd=sandbox.fd
+            ).st_size
+        except OSError:
+            continue  # Removed since the listing was taken
+        item_info = (
+            f"{path}: file_size={size} bytes, is_dir={'True' if is_dir else 'False'}"
+        )
         content_of_directory.append(item_info)
+    if len(listing) > offset + FILES_INFO_PAGE_SIZE:
+        content_of_directory.append(
+            f"[...More entries remain, call again with offset={offset + FILES_INFO_PAGE_SIZE}]"
+        )
 
     return "\n".join(content_of_directory)
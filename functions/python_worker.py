@@ -0,0 +1,34 @@
+# Warm interpreter for run_python_file. Started ahead of time by the worker
+# pool, it blocks until a job arrives on stdin, then runs the script as if it
+# had been launched with `python <script> <args>`.
+import json
+import os
+import runpy
+import sys
+import traceback
+
+
+def main():
+    line = sys.stdin.readline()
+    if not line:
+        return  # The pool shut down before handing out a job
+    job = json.loads(line)
+    script = job["script"]
+    sys.argv = [script, *job["args"]]
+    sys.path[0] = os.path.dirname(script)
+
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit:
+        raise
+    except BaseException as e:
+        # Hide the worker and runpy frames, like a fresh interpreter would
+        tb = e.__traceback__
+        while tb and tb.tb_frame.f_code.co_filename != script:
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb or e.__traceback__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
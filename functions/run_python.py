@@ -1,40 +1,225 @@
+import atexit
+import json
 import os
 import subprocess
-from pathlib import Path
-
-from google.genai import types
-
-schema_run_python_file = types.FunctionDeclaration(
-    name="run_python_file",
-    description="Execute a Python file in the specified working directory, constrained to the working directory. Accepts a file path and optional arguments to pass to the script. If the file does not exist, is not a Python file, or is outside the working directory, an error will be returned.",
-    parameters=types.Schema(
-        type=types.Type.OBJECT,
-        properties={
-            "file_path": types.Schema(
-                type=types.Type.STRING,
-                description="The path to the Python file to execute, relative to the working directory. If not provided, cause an error. if file suffix is not .py, cause an error.",
-            ),
-            "args": types.Schema(
-                type=types.Type.ARRAY,
-                items=types.Schema(
+import sys
+import threading
+
+# Add the parent directory to Python path so we can import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    RUN_PYTHON_KILL_OUTPUT_BYTES,
+    RUN_PYTHON_MAX_OUTPUT_BYTES,
+    RUN_PYTHON_TIMEOUT,
+    RUN_PYTHON_WARM_POOL_SIZE,
+)
+from functions.sandbox import get_sandbox
+from functions.schema import lazy_schema
+
+WORKER_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "python_worker.py"
+)
+
+
+def _schema(types):
+    return types.FunctionDeclaration(
+        name="run_python_file",
+        description="Execute a Python file in the specified working directory, constrained to the working directory. Accepts a file path and optional arguments to pass to the script. If the file does not exist, is not a Python file, or is outside the working directory, an error will be returned.",
+        parameters=types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                "file_path": types.Schema(
                     type=types.Type.STRING,
-                    description="Optional arguments to pass to the Python script. If not provided, no arguments will be passed.",
+                    description="The path to the Python file to execute, relative to the working directory. If not provided, cause an error. if file suffix is not .py, cause an error.",
                 ),
-                description="List of arguments to pass to the Python script.",
-            ),
-        },
-    ),
-)
+                "args": types.Schema(
+                    type=types.Type.ARRAY,
+                    items=types.Schema(
+                        type=types.Type.STRING,
+                        description="Optional arguments to pass to the Python script. If not provided, no arguments will be passed.",
+                    ),
+                    description="List of arguments to pass to the Python script.",
+                ),
+            },
+        ),
+    )
+
+
+__getattr__ = lazy_schema(__name__, "schema_run_python_file", _schema)
+
+
+class _BoundedOutput:
+    # Keeps the first and last halves of a stream within a byte limit and
+    # counts everything in between
+    def __init__(self, limit):
+        self.head_limit = limit // 2
+        self.tail_limit = limit - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def feed(self, data):
+        self.total += len(data)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            del self.tail[: -self.tail_limit or len(self.tail)]
+
+    def text(self, name):
+        head = self.head.decode("utf-8", errors="replace")
+        omitted = self.total - len(self.head) - len(self.tail)
+        if omitted <= 0:
+            return head + self.tail.decode("utf-8", errors="replace")
+        tail = self.tail.decode("utf-8", errors="replace")
+        return f"{head}\n[...{omitted} bytes of {name} truncated...]\n{tail}"
+
+
+class CapturedRun:
+    def __init__(self, returncode, stdout, stderr, timed_out, output_exceeded):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+        self.output_exceeded = output_exceeded
+
+
+def capture_process(process, timeout):
+    # Drain stdout and stderr incrementally so memory stays bounded, killing
+    # the process once it runs past the timeout or floods its pipes
+    outputs = {
+        "stdout": _BoundedOutput(RUN_PYTHON_MAX_OUTPUT_BYTES),
+        "stderr": _BoundedOutput(RUN_PYTHON_MAX_OUTPUT_BYTES),
+    }
+    lock = threading.Lock()
+    output_exceeded = threading.Event()
+
+    def pump(pipe, output):
+        while chunk := pipe.read1(65536):
+            with lock:
+                output.feed(chunk)
+                produced = sum(output.total for output in outputs.values())
+            if produced > RUN_PYTHON_KILL_OUTPUT_BYTES and not output_exceeded.is_set():
+                output_exceeded.set()
+                process.kill()
+        pipe.close()
+
+    readers = [
+        threading.Thread(target=pump, args=(process.stdout, outputs["stdout"])),
+        threading.Thread(target=pump, args=(process.stderr, outputs["stderr"])),
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out = False
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        process.kill()
+        process.wait()
+    for reader in readers:
+        reader.join()
+
+    return CapturedRun(
+        process.returncode,
+        outputs["stdout"].text("stdout"),
+        outputs["stderr"].text("stderr"),
+        timed_out,
+        output_exceeded.is_set(),
+    )
+
+
+class WarmPythonPool:
+    # Interpreters started ahead of time in one working directory. Each worker
+    # runs a single script and exits, so runs never share state; a replacement
+    # is started in the background as soon as a worker is taken.
+    def __init__(self, working_directory, size):
+        self.working_directory = str(working_directory)
+        self.size = size
+        self._idle = []
+        self._starting = 0
+        self._lock = threading.Lock()
+        self._fill()
+
+    def _spawn(self):
+        return subprocess.Popen(
+            ["python", WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.working_directory,
+        )
+
+    def _fill(self):
+        with self._lock:
+            missing = self.size - len(self._idle) - self._starting
+            self._starting += max(missing, 0)
+        for _ in range(missing):
+            worker = self._spawn()
+            with self._lock:
+                self._idle.append(worker)
+                self._starting -= 1
+
+    def _take(self):
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop(0)
+                if worker.poll() is None:
+                    return worker
+        return None
+
+    def run(self, command, timeout):
+        worker = self._take() or self._spawn()
+        threading.Thread(target=self._fill, daemon=True).start()
+
+        job = json.dumps({"script": command[1], "args": command[2:]}) + "\n"
+        worker.stdin.write(job.encode())
+        worker.stdin.close()
+        return capture_process(worker, timeout)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+            worker.wait()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_python_pool(working_directory):
+    if RUN_PYTHON_WARM_POOL_SIZE <= 0:
+        return None
+    working_directory = get_sandbox(working_directory).root
+    with _pools_lock:
+        pool = _pools.get(working_directory)
+        if pool is None:
+            pool = WarmPythonPool(working_directory, RUN_PYTHON_WARM_POOL_SIZE)
+            _pools[working_directory] = pool
+    return pool
+
+
+@atexit.register
+def _close_python_pools():
+    for pool in _pools.values():
+        pool.close()
 
 
 def run_python_file(working_directory, file_path, args=[]):
     try:
-        # Resolve paths first (before existence check)
-        working_directory = Path(working_directory).resolve()
-        full_path = (Path(working_directory) / file_path).resolve()
+        sandbox = get_sandbox(working_directory)
+        working_directory = sandbox.root
+        relative = sandbox.relative(file_path)
 
-        if not full_path.is_relative_to(working_directory):
+        if relative is None:
             return f'Error: Cannot execute "{file_path}" as it is outside the permitted working directory'
+        full_path = sandbox.path(relative)
         if not full_path.exists():
             return f'Error: File "{file_path}" not found.'
         if full_path.suffix != ".py":
@@ -51,13 +236,17 @@ def run_python_file(working_directory, file_path, args=[]):
                 # If args is a single string, convert to list
                 command.append(str(args))
 
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            timeout=30,
-            cwd=str(working_directory),
-        )
+        pool = get_python_pool(working_directory)
+        if pool:
+            result = pool.run(command, timeout=RUN_PYTHON_TIMEOUT)
+        else:
+            process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=str(working_directory),
+            )
+            result = capture_process(process, RUN_PYTHON_TIMEOUT)
 
         output = ""
         if result.stdout:
@@ -66,7 +255,11 @@ def run_python_file(working_directory, file_path, args=[]):
             output += f"STDERR: {result.stderr}\n"
         if not output:
             output = "No output produced."
-        if result.returncode != 0:
+        if result.timed_out:
+            output += f"Process timed out after {RUN_PYTHON_TIMEOUT} seconds and was killed.\n"
+        elif result.output_exceeded:
+            output += f"Process was killed after producing more than {RUN_PYTHON_KILL_OUTPUT_BYTES} bytes of output.\n"
+        elif result.returncode != 0:
             output += f"Process exited with code {result.returncode}.\n"
         return output
 
@@ -0,0 +1,330 @@
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from fnmatch import fnmatch
+from pathlib import Path
+
+# Add the parent directory to Python path so we can import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    FILES_INFO_IGNORE,
+    RUN_PYTHON_TIMEOUT,
+    TESTS_MAX_TRACEBACK_LINES,
+    TESTS_PATTERN,
+)
+from functions.file_index import get_file_index
+from functions.run_python import capture_process, get_python_pool
+from functions.sandbox import get_sandbox
+from functions.schema import lazy_schema
+from functions.write_file import add_write_listener
+
+
+def _schema(types):
+    return types.FunctionDeclaration(
+        name="run_tests",
+        description=f"Run the unittest tests under the working directory (files matching {TESTS_PATTERN}) and return a summary: counts of passed, failed, errored and skipped tests, with a trimmed traceback for each failure. Test files whose code and imported modules are unchanged since their last run are not run again; their previous results are reused and listed as cached. Prefer this over run_python_file for checking tests.",
+        parameters=types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                "file_paths": types.Schema(
+                    type=types.Type.ARRAY,
+                    items=types.Schema(type=types.Type.STRING),
+                    description="Test files or directories to limit the run to, relative to the working directory. Defaults to every test file.",
+                ),
+                "force": types.Schema(
+                    type=types.Type.BOOLEAN,
+                    description="Run the selected tests even if their results are cached.",
+                ),
+            },
+        ),
+    )
+
+
+__getattr__ = lazy_schema(__name__, "schema_run_tests", _schema)
+
+WORKER_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "test_worker.py"
+)
+
+
+def _version(full_path):
+    # None for a file that does not exist (yet)
+    try:
+        stat = full_path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class TestResults:
+    # Test results of one root, per test file. A test file's results are
+    # reused while neither it nor any local module it imports (directly or
+    # through other local modules) has changed. Files an import would load but
+    # that do not exist count too, so creating the missing module reruns a
+    # test that failed on it. Imports are found with ast and parsed once per
+    # file version; write_file drops the results that depend on the written
+    # file straight away.
+    def __init__(self, root):
+        self.root = Path(root).resolve()
+        self._imports = {}
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def _module_paths(self, name, bases):
+        # Local files a dotted import may load, the module itself and the
+        # __init__.py of every package on the way, as (found, missing)
+        parts = name.split(".")
+        missing = []
+        for base in bases:
+            found = []
+            for depth in range(1, len(parts) + 1):
+                package = base.joinpath(*parts[:depth])
+                candidates = [package / "__init__.py"]
+                if depth == len(parts):
+                    candidates.append(package.with_suffix(".py"))
+                for candidate in candidates:
+                    if candidate.is_file():
+                        found.append(candidate)
+                        break
+                else:
+                    missing.extend(candidates)
+            if found:
+                return found, missing
+        return [], missing
+
+    def _local_imports(self, full_path, bases):
+        version = _version(full_path)
+        key = (full_path, tuple(bases))
+        with self._lock:
+            cached = self._imports.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        try:
+            tree = ast.parse(full_path.read_bytes(), str(full_path))
+        except (SyntaxError, ValueError):
+            tree = ast.Module(body=[], type_ignores=[])
+        names = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.extend((alias.name, bases) for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                node_bases = bases
+                if node.level:
+                    node_bases = [full_path.parents[node.level - 1]]
+                module = node.module or ""
+                for alias in node.names:
+                    # "from pkg import batch" may name a submodule
+                    names.append((f"{module}.{alias.name}".strip("."), node_bases))
+                if module:
+                    names.append((module, node_bases))
+
+        paths = set()
+        missing = set()
+        for name, name_bases in names:
+            name_found, name_missing = self._module_paths(name, name_bases)
+            paths.update(name_found)
+            missing.update(name_missing)
+        paths.discard(full_path)
+        with self._lock:
+            self._imports[key] = (version, (paths, missing))
+        return paths, missing
+
+    def dependencies(self, test_path):
+        # The test file and every local file it imports, transitively, plus
+        # the local files its imports looked for and did not find
+        full_path = self.root / test_path
+        bases = [full_path.parent, self.root]
+        found = {full_path}
+        missing = set()
+        pending = [full_path]
+        while pending:
+            paths, not_found = self._local_imports(pending.pop(), bases)
+            missing.update(path for path in not_found if path.is_relative_to(self.root))
+            for path in paths:
+                if path not in found and path.is_relative_to(self.root):
+                    found.add(path)
+                    pending.append(path)
+        return found | missing
+
+    def fingerprint(self, test_path):
+        return tuple(
+            sorted((str(path), _version(path)) for path in self.dependencies(test_path))
+        )
+
+    def get(self, test_path, fingerprint):
+        with self._lock:
+            cached = self._results.get(test_path)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+        return None
+
+    def put(self, test_path, fingerprint, records):
+        with self._lock:
+            self._results[test_path] = (fingerprint, records)
+
+    def invalidate(self, path):
+        written = (self.root / path).resolve()
+        with self._lock:
+            for test_path, (fingerprint, _) in list(self._results.items()):
+                if any(Path(name) == written for name, _ in fingerprint):
+                    del self._results[test_path]
+
+
+_results = {}
+_results_lock = threading.Lock()
+
+
+def get_test_results(working_directory):
+    root = get_sandbox(working_directory).root
+    with _results_lock:
+        results = _results.get(root)
+        if results is None:
+            results = _results[root] = TestResults(root)
+    return results
+
+
+def _invalidate_on_write(working_directory, file_path):
+    results = _results.get(get_sandbox(working_directory).root)
+    if results:
+        results.invalidate(file_path)
+
+
+add_write_listener(_invalidate_on_write)
+
+
+def _discover(working_directory, selected):
+    for path, is_dir in get_file_index(working_directory).walk(
+        ignore=FILES_INFO_IGNORE
+    ):
+        if is_dir or not fnmatch(os.path.basename(path), TESTS_PATTERN):
+            continue
+        if selected and not any(
+            choice in (".", path) or path.startswith(choice + "/")
+            for choice in selected
+        ):
+            continue
+        yield path
+
+
+def _run(working_directory, test_paths):
+    # Runs the test files in one interpreter and returns their records
+    with tempfile.TemporaryDirectory() as directory:
+        results_path = os.path.join(directory, "results.json")
+        command = [
+            "python",
+            WORKER_SCRIPT,
+            results_path,
+            str(working_directory),
+            *test_paths,
+        ]
+        pool = get_python_pool(working_directory)
+        if pool:
+            result = pool.run(command, timeout=RUN_PYTHON_TIMEOUT)
+        else:
+            process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=str(working_directory),
+            )
+            result = capture_process(process, RUN_PYTHON_TIMEOUT)
+        if result.timed_out:
+            raise TimeoutError(f"tests timed out after {RUN_PYTHON_TIMEOUT} seconds")
+        if not os.path.exists(results_path):
+            raise RuntimeError(
+                f"test runner exited with code {result.returncode}: {result.stderr}"
+            )
+        with open(results_path, encoding="utf-8") as file:
+            return json.load(file)
+
+
+def _trim(traceback):
+    lines = traceback.rstrip().splitlines()
+    if len(lines) <= TESTS_MAX_TRACEBACK_LINES:
+        return "\n".join(lines)
+    # The end names the failing assertion and line, which is what matters
+    return "\n".join(
+        [
+            f"[...{len(lines) - TESTS_MAX_TRACEBACK_LINES} lines]",
+            *lines[-TESTS_MAX_TRACEBACK_LINES:],
+        ]
+    )
+
+
+def run_tests(working_directory, file_paths=None, force=False):
+    sandbox = get_sandbox(working_directory)
+    working_directory = sandbox.root
+
+    selected = []
+    for file_path in file_paths or []:
+        relative = sandbox.relative(file_path)
+        if relative is None:
+            return f'Error: Cannot run tests in "{file_path}" as it is outside the permitted working directory'
+        if not sandbox.path(relative).exists():
+            return f'Error: "{file_path}" not found'
+        selected.append(relative)
+
+    test_paths = list(_discover(working_directory, selected))
+    if not test_paths:
+        return f"No test files matching {TESTS_PATTERN} found"
+
+    results = get_test_results(working_directory)
+    records = []
+    cached = []
+    stale = {}
+    for test_path in test_paths:
+        fingerprint = results.fingerprint(test_path)
+        previous = None if force else results.get(test_path, fingerprint)
+        if previous is None:
+            stale[test_path] = fingerprint
+        else:
+            cached.append(test_path)
+            records.extend(previous)
+
+    if stale:
+        try:
+            fresh = _run(working_directory, list(stale))
+        except Exception as e:
+            return f"Error: running tests: {e}"
+        # Tests may have written files the index has not heard about
+        get_file_index(working_directory).clear()
+        sandbox.clear()
+        for test_path, fingerprint in stale.items():
+            results.put(
+                test_path,
+                fingerprint,
+                [record for record in fresh if record["file"] == test_path],
+            )
+        records.extend(fresh)
+
+    counts = {"passed": 0, "failed": 0, "error": 0, "skipped": 0}
+    problems = []
+    for record in records:
+        counts[record["status"]] += 1
+        if record["status"] in ("failed", "error"):
+            problem = {
+                "test": record.get("test", record["file"]),
+                "status": record["status"],
+            }
+            if record.get("traceback"):
+                problem["traceback"] = _trim(record["traceback"])
+            problems.append(problem)
+
+    summary = {
+        "passed": counts["passed"],
+        "failed": counts["failed"],
+        "errors": counts["error"],
+        "skipped": counts["skipped"],
+        "ran": list(stale),
+    }
+    if cached:
+        summary["cached"] = cached
+    if problems:
+        summary["problems"] = problems
+    return summary
@@ -0,0 +1,205 @@
+import errno
+import os
+import sys
+import threading
+from collections import deque
+from pathlib import Path
+
+# Add the parent directory to Python path so we can import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import WORKING_DIRECTORY
+
+# Symlinks followed while opening one path, as in the kernel's own limit
+MAX_SYMLINKS = 40
+
+# Paths whose containment check is remembered before the cache is reset
+MAX_CACHED_PATHS = 4096
+
+_DIRECTORY_FLAGS = os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW | os.O_CLOEXEC
+
+
+def normalize_path(path):
+    # A tool's path argument as compared between calls, "." for the root
+    if not path:
+        return "."
+    return os.path.normpath(str(path))
+
+
+def paths_overlap(a, b):
+    # Whether one normalized path is the other or lies inside it; the
+    # dispatcher's conflicts and the tool cache's invalidation both use this
+    if a == "." or b == ".":
+        return True
+    return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+
+def _parts(path):
+    return [part for part in str(path).split("/") if part and part != "."]
+
+
+class Sandbox:
+    # The workspace root, resolved once and held open as a directory file
+    # descriptor. relative() answers whether a path stays inside the root and
+    # remembers the answer; open() and parent() then reach the file by opening
+    # one component at a time from the root descriptor with O_NOFOLLOW and
+    # following symlinks by hand. A path therefore cannot leave the root
+    # through a symlink or "..", even one swapped in after it was checked.
+    def __init__(self, root):
+        self.root = Path(root).resolve()
+        self.fd = os.open(self.root, os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC)
+        self._relative = {}
+        self._lock = threading.Lock()
+
+    def relative(self, path):
+        # Returns path relative to the root with symlinks resolved ("." for
+        # the root itself), or None when it points outside
+        path = str(path or ".")
+        with self._lock:
+            if path in self._relative:
+                return self._relative[path]
+
+        full_path = (self.root / path).resolve()
+        relative = None
+        if full_path.is_relative_to(self.root):
+            relative = str(full_path.relative_to(self.root))
+        with self._lock:
+            if len(self._relative) >= MAX_CACHED_PATHS:
+                self._relative.clear()
+            self._relative[path] = relative
+        return relative
+
+    def path(self, relative):
+        return self.root / relative
+
+    def clear(self):
+        # Scripts may have added or changed symlinks behind our back
+        with self._lock:
+            self._relative.clear()
+
+    def _outside(self, path):
+        return PermissionError(
+            errno.EACCES, "outside the permitted working directory", str(path)
+        )
+
+    def _walk(self, parts, create):
+        # Opens every directory in parts from the root and returns
+        # (descriptor, directory parts as reached), symlinks replaced by
+        # their targets. The caller closes the descriptor.
+        parts = deque(parts)
+        fd = os.dup(self.fd)
+        stack = []  # Descriptors of the directories above fd, for ".."
+        reached = []
+        links = 0
+        try:
+            while parts:
+                part = parts.popleft()
+                if part == "..":
+                    if not stack:
+                        raise self._outside("..")
+                    os.close(fd)
+                    fd = stack.pop()
+                    reached.pop()
+                    continue
+                try:
+                    child = os.open(part, _DIRECTORY_FLAGS, dir_fd=fd)
+                except FileNotFoundError:
+                    if not create:
+                        raise
+                    os.mkdir(part, dir_fd=fd)
+                    child = os.open(part, _DIRECTORY_FLAGS, dir_fd=fd)
+                except OSError as e:
+                    if e.errno not in (errno.ELOOP, errno.ENOTDIR):
+                        raise
+                    try:
+                        target = os.readlink(part, dir_fd=fd)
+                    except OSError:
+                        raise e from None  # A file where a directory should be
+                    links += 1
+                    if links > MAX_SYMLINKS:
+                        raise OSError(errno.ELOOP, os.strerror(errno.ELOOP), part)
+                    if target.startswith("/"):
+                        # Absolute links are fine as long as they stay inside
+                        target = os.path.relpath(target, self.root)
+                        if target == ".." or target.startswith("../"):
+                            raise self._outside(target)
+                        for descriptor in stack:
+                            os.close(descriptor)
+                        os.close(fd)
+                        stack = []
+                        fd = os.dup(self.fd)
+                        reached = []
+                    parts.extendleft(reversed(_parts(target)))
+                    continue
+                stack.append(fd)
+                fd = child
+                reached.append(part)
+            return fd, reached
+        except BaseException:
+            os.close(fd)
+            raise
+        finally:
+            for descriptor in stack:
+                os.close(descriptor)
+
+    def parent(self, path, create=False):
+        # Returns (directory descriptor, name) for the final component of
+        # path, with symlinks along the way and at the end followed inside
+        # the root. create makes missing directories. The caller closes the
+        # descriptor.
+        parts = _parts(path)
+        for _ in range(MAX_SYMLINKS):
+            if not parts or parts[-1] == "..":
+                fd, _ = self._walk(parts, create)
+                return fd, "."
+            fd, reached = self._walk(parts[:-1], create)
+            name = parts[-1]
+            try:
+                target = os.readlink(name, dir_fd=fd)
+            except OSError:
+                return fd, name  # Not a symlink, or not there yet
+            os.close(fd)
+            if target.startswith("/"):
+                parts = _parts(os.path.relpath(target, self.root))
+            else:
+                parts = reached + _parts(target)
+        raise OSError(errno.ELOOP, os.strerror(errno.ELOOP), str(path))
+
+    def open(self, path, flags=os.O_RDONLY, mode=0o666):
+        directory, name = self.parent(path)
+        try:
+            return os.open(
+                name, flags | os.O_NOFOLLOW | os.O_CLOEXEC, mode, dir_fd=directory
+            )
+        finally:
+            os.close(directory)
+
+
+_sandboxes = {}
+_sandboxes_lock = threading.Lock()
+_workspace = WORKING_DIRECTORY
+
+
+def set_workspace(root):
+    # Makes root the workspace that tools and get_sandbox() use by default
+    global _workspace
+    _workspace = root
+
+
+def get_workspace():
+    return _workspace
+
+
+def get_sandbox(working_directory=None):
+    # One sandbox per root for the whole run. Looked up by the working
+    # directory as given, so repeat calls cost a dictionary lookup.
+    key = working_directory or _workspace
+    sandbox = _sandboxes.get(key)
+    if sandbox is None:
+        with _sandboxes_lock:
+            root = Path(key).resolve()
+            sandbox = _sandboxes.get(root)
+            if sandbox is None:
+                sandbox = _sandboxes[root] = Sandbox(root)
+            _sandboxes[key] = sandbox
+    return sandbox
@@ -0,0 +1,20 @@
+import sys
+
+
+def lazy_schema(module_name, name, build):
+    # Returns a module __getattr__ that builds the tool's schema the first time
+    # it is looked up. Importing google.genai takes longer than the rest of the
+    # CLI put together, so tool modules stay importable without it and only
+    # pay for it when the schema is actually sent to the model.
+    def __getattr__(attribute):
+        if attribute != name:
+            raise AttributeError(
+                f"module {module_name!r} has no attribute {attribute!r}"
+            )
+        from google.genai import types
+
+        schema = build(types)
+        setattr(sys.modules[module_name], name, schema)
+        return schema
+
+    return __getattr__
@@ -0,0 +1,221 @@
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from fnmatch import fnmatch
+
+# Add the parent directory to Python path so we can import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    FILES_INFO_IGNORE,
+    SEARCH_CACHE_BYTES,
+    SEARCH_MAX_CONTEXT_LINES,
+    SEARCH_MAX_FILE_BYTES,
+    SEARCH_MAX_LINE_LENGTH,
+    SEARCH_MAX_MATCHES,
+)
+from functions.file_index import get_file_index
+from functions.sandbox import get_sandbox
+from functions.schema import lazy_schema
+from functions.write_file import add_write_listener
+
+
+def _schema(types):
+    return types.FunctionDeclaration(
+        name="search_files",
+        description=f"Search the contents of text files under a directory, constrained to the working directory. Returns matching lines as path:line: text, with optional surrounding context lines (path-line- text). At most {SEARCH_MAX_MATCHES} matches are returned. Use this to find where something is defined or used instead of reading files one by one.",
+        parameters=types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                "pattern": types.Schema(
+                    type=types.Type.STRING,
+                    description="Regular expression (Python syntax) to search for, or plain text when literal is true. pattern is mandatory.",
+                ),
+                "literal": types.Schema(
+                    type=types.Type.BOOLEAN,
+                    description="Treat pattern as plain text instead of a regular expression.",
+                ),
+                "ignore_case": types.Schema(
+                    type=types.Type.BOOLEAN,
+                    description="Match regardless of letter case.",
+                ),
+                "directory": types.Schema(
+                    type=types.Type.STRING,
+                    description="Directory to search, relative to the working directory. Defaults to the working directory itself.",
+                ),
+                "file_pattern": types.Schema(
+                    type=types.Type.STRING,
+                    description="Only search files whose name or relative path matches this glob, e.g. '*.py'.",
+                ),
+                "context": types.Schema(
+                    type=types.Type.INTEGER,
+                    description=f"Number of lines to show before and after each match, at most {SEARCH_MAX_CONTEXT_LINES}. Defaults to 0.",
+                ),
+            },
+        ),
+    )
+
+
+__getattr__ = lazy_schema(__name__, "schema_search_files", _schema)
+
+
+class SearchIndex:
+    # Lines of every text file searched so far under one root. Entries are
+    # keyed on mtime and size, so each file is read once and again only after
+    # it changes; write_file refreshes the written file straight away. Once
+    # the cached files add up to more than max_bytes the least recently
+    # searched are dropped.
+    def __init__(self, root, max_bytes=SEARCH_CACHE_BYTES):
+        self.sandbox = get_sandbox(root)
+        self.root = self.sandbox.root
+        self.max_bytes = max_bytes
+        self._files = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def lines(self, path):
+        # Returns the file's lines, or None for binary and oversized files
+        full_path = self.root / path
+        stat = full_path.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._files.get(path)
+            if cached and cached[0] == version:
+                self._files.move_to_end(path)
+                return cached[1]
+
+        lines = None
+        if stat.st_size <= SEARCH_MAX_FILE_BYTES:
+            # Opened through the sandbox, so a symlink cannot lead outside
+            with os.fdopen(self.sandbox.open(path), "rb") as file:
+                data = file.read()
+            if b"\0" not in data:
+                lines = data.decode("utf-8", errors="replace").splitlines()
+        with self._lock:
+            self._forget(path)
+            self._files[path] = (version, lines)
+            if lines is not None:
+                self._total_bytes += stat.st_size
+            while self._total_bytes > self.max_bytes:
+                self._forget(next(iter(self._files)))
+        return lines
+
+    def _forget(self, path):
+        cached = self._files.pop(path, None)
+        if cached and cached[1] is not None:
+            self._total_bytes -= cached[0][1]
+
+    def update(self, path):
+        path = os.path.normpath(path)
+        with self._lock:
+            self._forget(path)
+        try:
+            self.lines(path)
+        except OSError:
+            pass
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(working_directory):
+    root = get_sandbox(working_directory).root
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = SearchIndex(root)
+    return index
+
+
+def _update_on_write(working_directory, file_path):
+    index = _indexes.get(get_sandbox(working_directory).root)
+    if index:
+        index.update(file_path)
+
+
+add_write_listener(_update_on_write)
+
+
+def _clip(line):
+    if len(line) <= SEARCH_MAX_LINE_LENGTH:
+        return line
+    return line[:SEARCH_MAX_LINE_LENGTH] + "..."
+
+
+def search_files(
+    working_directory,
+    pattern,
+    literal=False,
+    ignore_case=False,
+    directory=".",
+    file_pattern=None,
+    context=0,
+):
+    sandbox = get_sandbox(working_directory)
+    relative_directory = sandbox.relative(directory)
+
+    if relative_directory is None:
+        return f'Error: Cannot search "{directory}" as it is outside the permitted working directory'
+    if not sandbox.path(relative_directory).is_dir():
+        return f'Error: "{directory}" is not a directory'
+
+    try:
+        regex = re.compile(
+            re.escape(pattern) if literal else pattern,
+            re.IGNORECASE if ignore_case else 0,
+        )
+    except re.error as e:
+        return f'Error: invalid pattern "{pattern}": {e}'
+
+    context = max(0, min(int(context or 0), SEARCH_MAX_CONTEXT_LINES))
+    file_index = get_file_index(working_directory)
+    search_index = get_search_index(working_directory)
+
+    results = []
+    matches = 0
+    for path, is_dir in file_index.walk(relative_directory, ignore=FILES_INFO_IGNORE):
+        if is_dir:
+            continue
+        if file_pattern and not (
+            fnmatch(os.path.basename(path), file_pattern) or fnmatch(path, file_pattern)
+        ):
+            continue
+
+        relative_path = os.path.normpath(os.path.join(relative_directory, path))
+        try:
+            lines = search_index.lines(relative_path)
+        except OSError:
+            continue
+        if not lines:
+            continue
+
+        shown = -1  # Last line already printed, so context blocks do not repeat
+        for number, line in enumerate(lines):
+            if not regex.search(line):
+                continue
+            if matches == SEARCH_MAX_MATCHES:
+                results.append(
+                    f"[...Stopped after {SEARCH_MAX_MATCHES} matches, narrow the pattern or directory]"
+                )
+                return "\n".join(results)
+            matches += 1
+
+            first = max(number - context, shown + 1)
+            if context and results and first > shown + 1:
+                results.append("--")
+            for before in range(first, number):
+                results.append(f"{relative_path}-{before + 1}- {_clip(lines[before])}")
+            results.append(f"{relative_path}:{number + 1}: {_clip(line)}")
+            shown = number
+            for after in range(number + 1, min(number + 1 + context, len(lines))):
+                if regex.search(lines[after]):
+                    break  # Printed as a match of its own
+                results.append(f"{relative_path}-{after + 1}- {_clip(lines[after])}")
+                shown = after
+
+    if not results:
+        return f'No matches found for "{pattern}"'
+    return "\n".join(results)
@@ -0,0 +1,109 @@
+# Test runner for run_tests, started like any script run by run_python_file:
+#
+#   python test_worker.py <results.json> <root> <test file>...
+#
+# Loads the unittest cases of each test file, runs them and writes a JSON list
+# with a record per test (or per test file that failed to import) to
+# results.json.
+# Anything the tests print goes to stderr so it cannot mix with the results.
+import importlib.util
+import json
+import os
+import sys
+import traceback
+import unittest
+
+
+class _Result(unittest.TestResult):
+    def __init__(self, file_path, records):
+        super().__init__()
+        self.file_path = file_path
+        self.records = records
+
+    def _record(self, test, status, error=None):
+        record = {"test": test.id(), "file": self.file_path, "status": status}
+        if error:
+            record["traceback"] = self._exc_info_to_string(error, test)
+        self.records.append(record)
+
+    def addSuccess(self, test):
+        self._record(test, "passed")
+
+    def addFailure(self, test, error):
+        self._record(test, "failed", error)
+
+    def addError(self, test, error):
+        self._record(test, "error", error)
+
+    def addSkip(self, test, reason):
+        self._record(test, "skipped")
+
+    def addExpectedFailure(self, test, error):
+        self._record(test, "passed")
+
+    def addUnexpectedSuccess(self, test):
+        self._record(test, "failed")
+
+
+def _is_local(module, root):
+    # Loaded from a file or directory under root; namespace packages only
+    # have __path__
+    paths = [getattr(module, "__file__", None), *getattr(module, "__path__", [])]
+    return any(
+        path and os.path.realpath(path).startswith(root + os.sep) for path in paths
+    )
+
+
+def run_file(root, file_path, records):
+    full_path = os.path.join(root, file_path)
+    # Tests import their siblings, as they would when run as a script
+    sys.path[:0] = [os.path.dirname(full_path), root]
+    loaded = set(sys.modules)
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    try:
+        try:
+            spec = importlib.util.spec_from_file_location(name, full_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            suite = unittest.defaultTestLoader.loadTestsFromModule(module)
+        except Exception as e:
+            # Hide the worker and importlib frames, as python_worker does
+            tb = e.__traceback__
+            while tb and tb.tb_frame.f_code.co_filename != full_path:
+                tb = tb.tb_next
+            records.append(
+                {
+                    "file": file_path,
+                    "status": "error",
+                    "traceback": "".join(
+                        traceback.format_exception(type(e), e, tb or e.__traceback__)
+                    ),
+                }
+            )
+            return
+        suite.run(_Result(file_path, records))
+    finally:
+        del sys.path[:2]
+        # Forget the project's own modules, so a same-named helper next to
+        # the next test file is imported afresh instead of reused
+        local_root = os.path.realpath(root)
+        for module_name in set(sys.modules) - loaded:
+            if _is_local(sys.modules[module_name], local_root):
+                del sys.modules[module_name]
+
+
+def main():
+    results_path, root, *file_paths = sys.argv[1:]
+    records = []
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    try:
+        for file_path in file_paths:
+            run_file(root, file_path, records)
+    finally:
+        sys.stdout = stdout
+    with open(results_path, "w", encoding="utf-8") as file:
+        json.dump(records, file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from functions.sandbox import get_sandbox, normalize_path, paths_overlap
+
+
+def _file_fingerprint(root, path, args):
+    try:
+        stat = os.stat(os.path.join(root, path))
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _directory_fingerprint(root, path, args):
+    if args.get("recursive"):
+        return None  # Covered by the file index, which tracks every level
+    # Listings report entry sizes, so the fingerprint covers every entry and
+    # not just the directory mtime, which only changes on add/remove.
+    digest = hashlib.sha256()
+    try:
+        with os.scandir(os.path.join(root, path)) as entries:
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                stat = entry.stat(follow_symlinks=False)
+                digest.update(
+                    f"{entry.name}:{stat.st_mtime_ns}:{stat.st_size}\n".encode()
+                )
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+# Read-only tools whose results can be reused: argument naming the path they
+# read and how to fingerprint that path.
+CACHEABLE_TOOLS = {
+    "get_file_content": ("file_path", _file_fingerprint),
+    "get_files_info": ("directory", _directory_fingerprint),
+}
+
+
+# Last-used times collected before they are written to SQLite
+USED_FLUSH_EVERY = 64
+
+
+class ToolCache:
+    # Results live in SQLite so they survive restarts, with the most recently
+    # used ones also kept in memory. A hit in memory touches no database; the
+    # last-used times that drive eviction are written in batches. The total
+    # size is kept as a running count, so a put only evicts, walking the used
+    # index, once the cache is actually over its cap.
+    def __init__(self, path, max_bytes, memory_entries=512):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # digest -> (root, path, value)
+        self._used = {}  # digest -> last use not yet written
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # A lost last-used time after a crash only affects eviction order
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                root TEXT NOT NULL,
+                path TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                used REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS results_path ON results (root, path)"
+        )
+        self._db.commit()
+        # Counted once per process; other processes sharing the file only
+        # make eviction start a little early or late
+        self._total_bytes = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()[0]
+        atexit.register(self.flush)
+
+    def key(self, function_name, working_directory, args):
+        if function_name not in CACHEABLE_TOOLS:
+            return None
+        path_arg, fingerprint = CACHEABLE_TOOLS[function_name]
+        root = str(get_sandbox(working_directory).root)
+        path = normalize_path(args.get(path_arg))
+        version = fingerprint(root, path, args)
+        if version is None:
+            return None
+        payload = json.dumps(
+            [function_name, root, sorted(args.items()), version],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest(), root, path
+
+    def get(self, key):
+        digest, root, path = key
+        with self._lock:
+            entry = self._memory.get(digest)
+            if entry is None:
+                row = self._db.execute(
+                    "SELECT value FROM results WHERE key = ?", (digest,)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                entry = self._remember(digest, root, path, json.loads(row[0]))
+            else:
+                self._memory.move_to_end(digest)
+            self.hits += 1
+            self._used[digest] = time.time()
+            if len(self._used) >= USED_FLUSH_EVERY:
+                self._flush_used()
+                self._db.commit()
+            return entry[2]
+
+    def put(self, key, value):
+        digest, root, path = key
+        encoded = json.dumps(value)
+        with self._lock:
+            self._remember(digest, root, path, value)
+            self._used.pop(digest, None)
+            self._flush_used()
+            replaced = self._db.execute(
+                "SELECT size FROM results WHERE key = ?", (digest,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, root, path, encoded, len(encoded), time.time()),
+            )
+            self._total_bytes += len(encoded) - (replaced[0] if replaced else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def invalidate(self, working_directory, path):
+        root = str(get_sandbox(working_directory).root)
+        path = normalize_path(path)
+        with self._lock:
+            for digest, (cached_root, cached, _) in list(self._memory.items()):
+                if cached_root == root and paths_overlap(cached, path):
+                    del self._memory[digest]
+            if path == ".":
+                rows = self._db.execute(
+                    "SELECT key, size FROM results WHERE root = ?", (root,)
+                ).fetchall()
+            else:
+                # The path, the directories above it and everything below it,
+                # found through the (root, path) index
+                parts = path.split(os.sep)
+                above = [
+                    ".",
+                    *(os.sep.join(parts[:n]) for n in range(1, len(parts) + 1)),
+                ]
+                rows = self._db.execute(
+                    f"""
+                    SELECT key, size FROM results
+                    WHERE root = ? AND path IN ({", ".join("?" * len(above))})
+                    UNION ALL
+                    SELECT key, size FROM results
+                    WHERE root = ? AND path > ? AND path < ?
+                    """,
+                    (root, *above, root, path + os.sep, path + chr(ord(os.sep) + 1)),
+                ).fetchall()
+            self._delete(rows)
+            self._db.commit()
+
+    def flush(self):
+        with self._lock:
+            self._flush_used()
+            self._db.commit()
+
+    def _remember(self, digest, root, path, value):
+        entry = self._memory[digest] = (root, path, value)
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+        return entry
+
+    def _flush_used(self):
+        used, self._used = self._used, {}
+        self._db.executemany(
+            "UPDATE results SET used = ? WHERE key = ?",
+            [(when, digest) for digest, when in used.items()],
+        )
+
+    def _delete(self, rows):
+        for key, size in rows:
+            self._memory.pop(key, None)
+            self._total_bytes -= size
+        self._db.executemany(
+            "DELETE FROM results WHERE key = ?", [(key,) for key, _ in rows]
+        )
+
+    def _evict(self):
+        # Drop least recently used entries until the cache fits its size cap
+        rows = self._db.execute("SELECT key, size FROM results ORDER BY used")
+        stale = []
+        excess = self._total_bytes - self.max_bytes
+        for key, size in rows:
+            if excess <= 0:
+                break
+            stale.append((key, size))
+            excess -= size
+        self._delete(stale)
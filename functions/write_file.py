@@ -1,48 +1,134 @@
 import os
-from pathlib import Path
-
-from google.genai import types
-
-schema_write_file = types.FunctionDeclaration(
-    name="write_file",
-    description="Write content to a file in the specified working directory, constrained to the working directory. If the file does not exist, it will be created. If the file is outside the working directory, an error will be returned.",
-    parameters=types.Schema(
-        type=types.Type.OBJECT,
-        properties={
-            "file_path": types.Schema(
-                type=types.Type.STRING,
-                description="The path to the file to write, relative to the working directory. If not provided, cause an error.",
-            ),
-            "content": types.Schema(
-                type=types.Type.STRING,
-                description="The content to write to the file. If not provided, cause an error.",
-            ),
-        },
-    ),
-)
+import secrets
+import stat
+import sys
+
+# Add the parent directory to Python path so we can import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import WRITE_FILE_FSYNC
+from functions.sandbox import get_sandbox
+from functions.schema import lazy_schema
+
+
+def _schema(types):
+    return types.FunctionDeclaration(
+        name="write_file",
+        description="Write content to a file in the specified working directory, constrained to the working directory. If the file does not exist, it will be created. If the file is outside the working directory, an error will be returned.",
+        parameters=types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                "file_path": types.Schema(
+                    type=types.Type.STRING,
+                    description="The path to the file to write, relative to the working directory. If not provided, cause an error.",
+                ),
+                "content": types.Schema(
+                    type=types.Type.STRING,
+                    description="The content to write to the file. If not provided, cause an error.",
+                ),
+            },
+        ),
+    )
+
+
+__getattr__ = lazy_schema(__name__, "schema_write_file", _schema)
+
+# Read once: os.umask can only be queried by setting it, which is not safe
+# while other threads create files
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Callbacks run after every successful write as listener(working_directory, file_path)
+_write_listeners = []
+
+
+def add_write_listener(listener):
+    _write_listeners.append(listener)
+
+
+def notify_write_listeners(working_directory, file_path):
+    # file_path is relative to the sandbox root, symlinks resolved
+    for listener in _write_listeners:
+        listener(working_directory, file_path)
+
+
+def atomic_write(directory, name, data, fsync=WRITE_FILE_FSYNC):
+    # Write to a temporary file next to the target and rename it into place,
+    # so an interrupted run never leaves a half-written file behind. Both are
+    # named relative to the open directory descriptor, never by path.
+    try:
+        mode = os.stat(name, dir_fd=directory, follow_symlinks=False).st_mode
+        mode = stat.S_IMODE(mode) if stat.S_ISREG(mode) else 0o666 & ~_UMASK
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    temp_name = f".{name}.{secrets.token_hex(4)}.tmp"
+    descriptor = os.open(
+        temp_name,
+        os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW | os.O_CLOEXEC,
+        0o600,
+        dir_fd=directory,
+    )
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+            os.fchmod(file.fileno(), mode)
+        os.replace(temp_name, name, src_dir_fd=directory, dst_dir_fd=directory)
+    except BaseException:
+        os.unlink(temp_name, dir_fd=directory)
+        raise
+
+    if fsync:
+        # Make the rename itself durable
+        os.fsync(directory)
+
+
+def changed_bytes(old, new):
+    # Size of the region that differs, ignoring the common prefix and suffix
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return max(len(old), len(new)) - prefix - suffix
+
+
+def read_regular_file(directory, name):
+    # None when name is missing or not a regular file
+    try:
+        descriptor = os.open(name, os.O_RDONLY | os.O_NOFOLLOW, dir_fd=directory)
+    except OSError:
+        return None
+    with os.fdopen(descriptor, "rb") as file:
+        if not stat.S_ISREG(os.fstat(descriptor).st_mode):
+            return None
+        return file.read()
 
 
 def write_file(working_directory, file_path, content):
     try:
-        # Resolve paths first (before existence check)
-        working_directory = Path(working_directory).resolve()
-        full_path = (Path(working_directory) / file_path).resolve()
+        sandbox = get_sandbox(working_directory)
+        relative = sandbox.relative(file_path)
 
-        if not full_path.is_relative_to(working_directory):
+        if relative is None:
             return f'Error: Cannot write to "{file_path}" as it is outside the permitted working directory'
 
-        full_path.parent.mkdir(
-            parents=True, exist_ok=True
-        )  # Ensure parent directories exist
-
-        full_path.touch(exist_ok=True)  # Create the file if it doesn't exist
+        # Missing parent directories are created on the way
+        directory, name = sandbox.parent(relative, create=True)
+        data = content.encode("utf-8")
+        try:
+            old_data = read_regular_file(directory, name) or b""
+            atomic_write(directory, name, data)
+        finally:
+            os.close(directory)
 
-        with open(full_path, "w", encoding="utf-8") as file:
-            file.write(content)
+        notify_write_listeners(working_directory, relative)
 
-        return (
-            f'Successfully wrote to "{file_path}" ({len(content)} characters written)'
-        )
+        return f'Successfully wrote to "{file_path}" ({changed_bytes(old_data, data)} bytes changed, {len(data)} bytes total)'
 
     except Exception as e:
         return f'Error: creating file "{file_path}" in "{working_directory}: {e}'
@@ -1,75 +1,21 @@
 import argparse
+import contextlib
 import os
 import sys
 
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
-
-from config import SYSTEM_PROMPT
-from functions.get_file_content import get_file_content, schema_get_file_content
-from functions.get_files_info import get_files_info, schema_get_files_info
-from functions.run_python import run_python_file, schema_run_python_file
-from functions.write_file import schema_write_file, write_file
-
-
-def call_function(function_call_part, verbose=False):
-    if verbose:
-        print(f"Calling function: {function_call_part.name}({function_call_part.args})")
-    else:
-        print(f" - Calling function: {function_call_part.name}")
-
-    functions = {
-        "get_files_info": get_files_info,
-        "get_file_content": get_file_content,
-        "run_python_file": run_python_file,
-        "write_file": write_file,
-    }
-
-    function_name = function_call_part.name
-
-    function = functions.get(function_name)
-
-    if not function:
-        return types.Content(
-            role="tool",
-            parts=[
-                types.Part.from_function_response(
-                    name=function_name,
-                    response={"error": f"Unknown function: {function_name}"},
-                )
-            ],
-        )
-
-    try:
-        function_result = function(
-            working_directory="./calculator",
-            **function_call_part.args,
-        )
-        if verbose:
-            print(f"Function result: {function_result}")
-        return types.Content(
-            role="tool",
-            parts=[
-                types.Part.from_function_response(
-                    name=function_name,
-                    response={"result": function_result},
-                )
-            ],
-        )
-    except Exception as e:
-        error_message = f"Error calling function {function_name}: {str(e)}"
-        if verbose:
-            print(error_message)
-        return types.Content(
-            role="tool",
-            parts=[
-                types.Part.from_function_response(
-                    name=function_name,
-                    response={"error": error_message},
-                )
-            ],
-        )
+from config import (
+    MAX_CONCURRENT_SESSIONS,
+    MODEL_BACKOFF_BASE,
+    MODEL_BACKOFF_MAX,
+    MODEL_CACHE_DIR,
+    MODEL_MAX_RETRIES,
+    MODEL_REQUESTS_PER_MINUTE,
+    MODEL_TOKENS_PER_MINUTE,
+    WORKING_DIRECTORY,
+)
+from functions.sandbox import get_sandbox, set_workspace
+from model_cache import RECORD, REPLAY, CachedClient
+from tracing import print_summary, tracer
 
 
 def main():
@@ -77,6 +23,7 @@ def main():
     parser = argparse.ArgumentParser(description="Generate content using Gemini AI")
     parser.add_argument(
         "prompt",
+        nargs="?",
         help="The prompt to send to the AI model",
     )
     parser.add_argument(
@@ -84,97 +31,199 @@ def main():
         default="gemini-3-flash-preview",
         help="Model to use (default: gemini-3-flash-preview)",
     )
+    parser.add_argument(
+        "--working-directory",
+        metavar="DIR",
+        default=WORKING_DIRECTORY,
+        help=f"Directory the tools are confined to (default: {WORKING_DIRECTORY})",
+    )
     parser.add_argument(
         "--verbose",
         action="store_true",
         help="Show detailed information about the request and response",
     )
 
-    args = parser.parse_args()
-
-    # Load environment and initialize client
-    load_dotenv()
-    api_key = os.environ.get("GEMINI_API_KEY")
-
-    if not api_key:
-        print("Error: GEMINI_API_KEY not found in environment variables")
-        sys.exit(1)
-
-    # Initialize client
-    client = genai.Client(api_key=api_key)
+    parser.add_argument(
+        "--model-cache",
+        choices=[RECORD, REPLAY],
+        help="Record model responses to disk, or replay them without the network",
+    )
+    parser.add_argument(
+        "--model-cache-dir",
+        default=MODEL_CACHE_DIR,
+        help=f"Directory for recorded model responses (default: {MODEL_CACHE_DIR})",
+    )
 
-    prompt = args.prompt
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Append JSON-lines spans for model and tool calls to FILE and print a summary at exit (no summary with --serve)",
+    )
 
-    messages = [
-        types.Content(role="user", parts=[types.Part(text=prompt)]),
-    ]
+    parser.add_argument(
+        "--fake-model",
+        action="store_true",
+        help="Answer with a local fake model instead of Gemini, no API key needed",
+    )
+    parser.add_argument(
+        "--fake-script",
+        metavar="FILE",
+        help="JSON script of turns for --fake-model (default: a short read-only script)",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=int,
+        default=MODEL_REQUESTS_PER_MINUTE,
+        help=f"Model requests allowed per minute, 0 for no limit (default: {MODEL_REQUESTS_PER_MINUTE})",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=int,
+        default=MODEL_TOKENS_PER_MINUTE,
+        help=f"Model tokens allowed per minute, 0 for no limit (default: {MODEL_TOKENS_PER_MINUTE})",
+    )
 
-    available_functions = types.Tool(
-        function_declarations=[
-            schema_get_files_info,
-            schema_get_file_content,
-            schema_run_python_file,
-            schema_write_file,
-        ]
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help='Run every prompt in a JSON-lines FILE ("-" for stdin), one {"prompt": ...} per line',
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="SOCKET",
+        help="Listen on a Unix socket for JSON-lines prompts and answer each with its result",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=MAX_CONCURRENT_SESSIONS,
+        help=f"Sessions run at once with --batch or --serve (default: {MAX_CONCURRENT_SESSIONS})",
     )
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        help="Write --batch results to FILE instead of stdout",
+    )
+
+    args = parser.parse_args()
+    if sum(1 for mode in (args.prompt, args.batch, args.serve) if mode) != 1:
+        parser.error("give exactly one of a prompt, --batch or --serve")
 
+    # Open the workspace now, so a bad directory fails before any model call
+    set_workspace(args.working_directory)
     try:
-        i = 0
-        while i <= 20:
-            i += 1
-            # Generate content using the provided prompt
-            response = client.models.generate_content(
-                model=args.model,
-                contents=messages,
-                config=types.GenerateContentConfig(
-                    tools=[available_functions], system_instruction=SYSTEM_PROMPT
-                ),
+        get_sandbox()
+    except OSError as e:
+        parser.error(f"cannot open working directory {args.working_directory}: {e}")
+
+    # The SDK and the agent are imported only once they are needed, so --help
+    # and a missing API key return without paying for google.genai
+    client = None
+    if args.fake_model:
+        from fake_model import FakeClient
+
+        client = FakeClient.from_script(args.fake_script)
+    elif args.model_cache != REPLAY:
+        from dotenv import load_dotenv
+
+        # Load environment and initialize client
+        load_dotenv()
+        api_key = os.environ.get("GEMINI_API_KEY")
+
+        if not api_key:
+            print("Error: GEMINI_API_KEY not found in environment variables")
+            sys.exit(1)
+
+        from google import genai
+
+        # Initialize client. Batch sessions share its connection pool, which
+        # keeps a kept-alive connection per concurrent session.
+        http_options = None
+        if not args.prompt:
+            import httpx
+            from google.genai import types
+
+            http_options = types.HttpOptions(
+                async_client_args={
+                    "limits": httpx.Limits(
+                        max_keepalive_connections=max(20, args.concurrency)
+                    )
+                }
             )
+        client = genai.Client(api_key=api_key, http_options=http_options)
+
+    if client is not None:
+        from scheduler import RateLimitedClient
+
+        # Paces requests and retries rate limit and server errors. Shared by
+        # every session, and below the cache so replayed responses are free.
+        client = RateLimitedClient(
+            client,
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+            max_retries=MODEL_MAX_RETRIES,
+            backoff_base=MODEL_BACKOFF_BASE,
+            backoff_max=MODEL_BACKOFF_MAX,
+        )
+
+    if args.model_cache:
+        client = CachedClient(client, args.model_cache, args.model_cache_dir)
 
-            for candidate in response.candidates:
-                messages.append(candidate.content)
-
-            if response.function_calls:
-                for function_call in response.function_calls:
-                    try:
-                        function_call_result = (
-                            call_function(function_call, verbose=args.verbose)
-                            .parts[0]
-                            .function_response.response
-                        )
-
-                        messages.append(
-                            types.Content(
-                                role="tool",
-                                parts=[
-                                    types.Part.from_function_response(
-                                        name=function_call.name,
-                                        response=function_call_result,
-                                    )
-                                ],
-                            )
-                        )
-                        if args.verbose:
-                            print(f"-> {function_call_result}")
-                    except Exception as e:
-                        print(f"Error calling function {function_call.name}: {e}")
-                        exit(1)
-                continue  # Skip to the next iteration if function calls are present
-
-            if args.verbose:
-                print(f"User prompt: {prompt}")
-                print(f"Prompt tokens: {response.usage_metadata.prompt_token_count}")
-                print(
-                    f"Response tokens: {response.usage_metadata.candidates_token_count}"
-                )
-
-            if response.text:
-                print(response.text)
-                break  # Exit loop if text response is received
+    import asyncio
 
+    from agent import run_session
+
+    if args.trace:
+        # A server runs until it is stopped, so it only writes the trace file
+        tracer.open(args.trace, keep_records=not args.serve)
+
+    try:
+        if args.prompt:
+            asyncio.run(
+                run_session(client, args.prompt, args.model, verbose=args.verbose)
+            )
+        else:
+            asyncio.run(run_many(client, args))
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
         print(f"Error generating content: {e}")
         sys.exit(1)
+    finally:
+        if args.trace:
+            if tracer.keep_records:
+                print_summary()
+            tracer.close()
+
+
+async def run_many(client, args):
+    from batch import read_requests, run_batch, serve
+    from functions.run_python import get_python_pool
+
+    # Many sessions will share the warm interpreters, so start them up front.
+    # A single prompt starts them on its first run_python_file or run_tests.
+    get_python_pool(get_sandbox().root)
+
+    # Results own stdout, so the per-tool progress lines go to stderr
+    output = sys.stdout
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+        if args.serve:
+            await serve(client, args.serve, args.model, args.concurrency, args.verbose)
+            return
+        if args.output:
+            output = stack.enter_context(open(args.output, "w", encoding="utf-8"))
+        source = sys.stdin
+        if args.batch != "-":
+            source = stack.enter_context(open(args.batch, encoding="utf-8"))
+        await run_batch(
+            client,
+            read_requests(source),
+            args.model,
+            output,
+            args.concurrency,
+            args.verbose,
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+from tracing import tracer
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+def request_key(model, contents, config):
+    # Stable hash of everything that determines the model's answer: model
+    # name, system instruction, tool schemas and the message history.
+    payload = {
+        "model": model,
+        "config": config.model_dump(mode="json", exclude_none=True) if config else None,
+        "contents": [
+            content.model_dump(mode="json", exclude_none=True) for content in contents
+        ],
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class CachedClient:
+    # Stands in for genai.Client in the agent loop. In record mode responses
+    # are served from disk when present and saved after a real call otherwise;
+    # in replay mode the network is never used and a miss is an error.
+    def __init__(self, client, mode, directory):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"unknown model cache mode: {mode}")
+        if mode == RECORD and client is None:
+            raise ValueError("record mode needs a real client")
+        self.client = client
+        self.mode = mode
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.models = SimpleNamespace(generate_content=self.generate_content)
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(generate_content_stream=self.generate_content_stream)
+        )
+
+    def _path(self, key):
+        return self.directory / f"{key}.jsonl"
+
+    def _load(self, key):
+        path = self._path(key)
+        if not path.exists():
+            self.misses += 1
+            tracer.event("model_cache", key=key, hit=False)
+            if self.mode == REPLAY:
+                raise LookupError(f"no recorded response for request {key}")
+            return None
+        self.hits += 1
+        tracer.event("model_cache", key=key, hit=True)
+        from google.genai import types
+
+        with open(path, encoding="utf-8") as file:
+            return [
+                types.GenerateContentResponse.model_validate_json(line)
+                for line in file
+                if line.strip()
+            ]
+
+    def _save(self, key, responses):
+        path = self._path(key)
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as file:
+            for response in responses:
+                file.write(response.model_dump_json(exclude_none=True) + "\n")
+        os.replace(temp_path, path)
+
+    def generate_content(self, *, model, contents, config=None):
+        key = request_key(model, contents, config)
+        recorded = self._load(key)
+        if recorded is not None:
+            return recorded[0]
+        response = self.client.models.generate_content(
+            model=model, contents=contents, config=config
+        )
+        self._save(key, [response])
+        return response
+
+    async def generate_content_stream(self, *, model, contents, config=None):
+        key = request_key(model, contents, config)
+        recorded = self._load(key)
+        if recorded is not None:
+            return self._replay(recorded)
+        stream = await self.client.aio.models.generate_content_stream(
+            model=model, contents=contents, config=config
+        )
+        return self._record(key, stream)
+
+    async def _replay(self, responses):
+        for response in responses:
+            yield response
+
+    async def _record(self, key, stream):
+        responses = []
+        async for response in stream:
+            responses.append(response)
+            yield response
+        # Only complete streams are saved
+        self._save(key, responses)
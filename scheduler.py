@@ -0,0 +1,159 @@
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from context import CHARS_PER_TOKEN
+from tracing import tracer
+
+
+class TokenBucket:
+    # Holds up to rate units and refills at rate units per minute. Spending can
+    # take the level below zero, e.g. when a response turns out to use more
+    # tokens than estimated, and later requests then wait for the refill.
+    def __init__(self, rate):
+        self.rate = rate
+        self.level = rate
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.rate, self.level + (now - self.updated) * self.rate / 60)
+        self.updated = now
+
+    def delay(self, amount):
+        # Seconds until amount is available. A request larger than the whole
+        # bucket only waits for a full bucket, or it would never run.
+        self._refill()
+        return max(0.0, (min(amount, self.rate) - self.level) * 60 / self.rate)
+
+    def spend(self, amount):
+        self._refill()
+        self.level -= amount
+
+
+def _status_code(error):
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def _retry_after(error):
+    # Server-suggested delay in seconds, from a Retry-After header or the
+    # RetryInfo detail Gemini attaches to 429 responses
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        pass
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in details.get("error", {}).get("details", []):
+            delay = str(detail.get("retryDelay", ""))
+            if delay.endswith("s"):
+                try:
+                    return float(delay[:-1])
+                except ValueError:
+                    pass
+    return None
+
+
+class RateLimitedClient:
+    # Stands in for genai.Client in the agent loop. Every streamed request
+    # first takes one request and its estimated tokens from per-minute token
+    # buckets shared by all sessions; the estimate is corrected with the real
+    # usage once the stream ends. Rate limit (429) and server (5xx) errors
+    # raised before the first chunk are retried with jittered exponential
+    # backoff. Time spent waiting is traced and summed in waited_s.
+    def __init__(
+        self,
+        client,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        max_retries=5,
+        backoff_base=1.0,
+        backoff_max=60.0,
+    ):
+        self.client = client
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.waited_s = 0.0
+        self.retries = 0
+        self._lock = asyncio.Lock()
+        # Only streaming goes through the limiter, which is all the agent uses
+        self.models = getattr(client, "models", None)
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(generate_content_stream=self.generate_content_stream)
+        )
+
+    async def _acquire(self, tokens):
+        # One waiter at a time, so sessions are served in arrival order
+        waited = 0.0
+        async with self._lock:
+            while True:
+                delay = max(
+                    self.requests.delay(1) if self.requests else 0.0,
+                    self.tokens.delay(tokens) if self.tokens else 0.0,
+                )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+                waited += delay
+            if self.requests:
+                self.requests.spend(1)
+            if self.tokens:
+                self.tokens.spend(tokens)
+        if waited:
+            self.waited_s += waited
+            tracer.event("rate_limit_wait", seconds=waited, tokens=tokens)
+
+    def _backoff(self, attempt, error):
+        # Full jitter: a random delay up to the exponential bound, so sessions
+        # that failed together do not retry together
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+        return max(delay, _retry_after(error) or 0.0)
+
+    async def generate_content_stream(self, *, model, contents, config=None):
+        estimate = (
+            sum(len(content.model_dump_json(exclude_none=True)) for content in contents)
+            // CHARS_PER_TOKEN
+        )
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(estimate)
+            try:
+                stream = await self.client.aio.models.generate_content_stream(
+                    model=model, contents=contents, config=config
+                )
+                # Errors often surface with the first chunk; after it, a retry
+                # would repeat output the caller has already acted on
+                first = await anext(stream, None)
+            except Exception as e:
+                code = _status_code(e)
+                if attempt == self.max_retries or not (
+                    code == 429 or (code is not None and 500 <= code < 600)
+                ):
+                    raise
+                delay = self._backoff(attempt, e)
+                self.retries += 1
+                self.waited_s += delay
+                tracer.event("retry", code=code, attempt=attempt + 1, seconds=delay)
+                await asyncio.sleep(delay)
+                continue
+            return self._relay(first, stream, estimate)
+
+    async def _relay(self, first, stream, estimate):
+        usage = None
+        if first is not None:
+            usage = first.usage_metadata
+            yield first
+            async for chunk in stream:
+                if chunk.usage_metadata:
+                    usage = chunk.usage_metadata
+                yield chunk
+        if self.tokens and usage and usage.total_token_count:
+            self.tokens.spend(usage.total_token_count - estimate)
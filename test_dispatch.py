@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import dispatch
+from dispatch import AsyncDispatcher, _access, _conflicts
+
+
+def call(name, **args):
+    return SimpleNamespace(name=name, args=args)
+
+
+class TestConflicts(unittest.TestCase):
+    def conflicts(self, first, second):
+        return _conflicts(_access(first), _access(second))
+
+    def test_write_then_run(self):
+        self.assertTrue(
+            self.conflicts(
+                call("write_file", file_path="pkg/a.py"),
+                call("run_python_file", file_path="main.py"),
+            )
+        )
+
+    def test_two_writes_to_one_path(self):
+        self.assertTrue(
+            self.conflicts(
+                call("write_file", file_path="pkg/a.py"),
+                call("edit_file", file_path="./pkg/a.py"),
+            )
+        )
+
+    def test_writes_to_different_paths(self):
+        self.assertFalse(
+            self.conflicts(
+                call("write_file", file_path="pkg/a.py"),
+                call("write_file", file_path="pkg/b.py"),
+            )
+        )
+
+    def test_write_inside_listed_directory(self):
+        self.assertTrue(
+            self.conflicts(
+                call("get_files_info", directory="pkg"),
+                call("write_file", file_path="pkg/a.py"),
+            )
+        )
+
+    def test_reads_never_conflict(self):
+        self.assertFalse(
+            self.conflicts(
+                call("get_file_content", file_path="main.py"),
+                call("run_tests"),
+            )
+        )
+
+    def test_unknown_tool_runs_alone(self):
+        self.assertTrue(
+            self.conflicts(
+                call("made_up_tool"), call("get_file_content", file_path="main.py")
+            )
+        )
+
+
+class TestAsyncDispatcher(unittest.TestCase):
+    def run_calls(self, calls):
+        # Records (name, start, end) for each call instead of running tools
+        spans = []
+        lock = threading.Lock()
+
+        def fake_call_function(function_call, verbose=False):
+            start = time.perf_counter()
+            time.sleep(0.05)
+            with lock:
+                spans.append(
+                    (function_call.args.get("file_path"), start, time.perf_counter())
+                )
+            return function_call.name
+
+        async def run():
+            dispatcher = AsyncDispatcher()
+            for function_call in calls:
+                dispatcher.submit(function_call)
+            return await dispatcher.results()
+
+        with mock.patch.object(dispatch, "call_function", fake_call_function):
+            results = asyncio.run(run())
+        return results, {path: (start, end) for path, start, end in spans}
+
+    def test_reads_run_in_parallel(self):
+        results, spans = self.run_calls(
+            [call("get_file_content", file_path=f"{n}.py") for n in range(3)]
+        )
+        self.assertEqual(results, ["get_file_content"] * 3)
+        latest_start = max(start for start, _ in spans.values())
+        earliest_end = min(end for _, end in spans.values())
+        self.assertLess(latest_start, earliest_end)
+
+    def test_write_then_run_waits(self):
+        results, spans = self.run_calls(
+            [
+                call("write_file", file_path="main.py"),
+                call("run_python_file", file_path="other.py"),
+            ]
+        )
+        self.assertEqual(results, ["write_file", "run_python_file"])
+        self.assertGreaterEqual(spans["other.py"][0], spans["main.py"][1])
+
+    def test_two_writes_to_one_path_run_in_order(self):
+        _, spans = self.run_calls(
+            [
+                call("write_file", file_path="a.py", content="1"),
+                call("edit_file", file_path="./b/../a.py"),
+            ]
+        )
+        first, second = sorted(spans.values())
+        self.assertGreaterEqual(second[0], first[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import os
+import tempfile
+import unittest
+
+from functions.edit_file import edit_file
+
+
+class TestEditFile(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.root = self._directory.name
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def write(self, name, data):
+        with open(os.path.join(self.root, name), "wb") as file:
+            file.write(data)
+
+    def read(self, name):
+        with open(os.path.join(self.root, name), "rb") as file:
+            return file.read()
+
+    def test_edits(self):
+        self.write("a.py", b"x = 1\ny = 2\n")
+        result = edit_file(
+            self.root,
+            "a.py",
+            edits=[
+                {"old_text": "x = 1", "new_text": "x = 10"},
+                {"old_text": "y = 2\n", "new_text": "y = 20\nz = 30\n"},
+            ],
+        )
+        self.assertTrue(result.startswith("Successfully edited"), result)
+        self.assertEqual(self.read("a.py"), b"x = 10\ny = 20\nz = 30\n")
+
+    def test_diff(self):
+        self.write("a.py", b"one\ntwo\nthree\n")
+        result = edit_file(
+            self.root,
+            "a.py",
+            diff="--- a.py\n+++ a.py\n@@ -1,3 +1,3 @@\n one\n-two\n+TWO\n three\n",
+        )
+        self.assertTrue(result.startswith("Successfully edited"), result)
+        self.assertEqual(self.read("a.py"), b"one\nTWO\nthree\n")
+
+    def test_diff_with_shifted_line_numbers(self):
+        self.write("a.py", b"zero\none\ntwo\nthree\n")
+        edit_file(self.root, "a.py", diff="@@ -1,2 +1,2 @@\n one\n-two\n+TWO\n")
+        self.assertEqual(self.read("a.py"), b"zero\none\nTWO\nthree\n")
+
+    def test_diff_keeps_crlf_line_endings(self):
+        self.write("a.txt", b"a\r\nb\r\nc\r\n")
+        edit_file(self.root, "a.txt", diff="@@ -1,3 +1,4 @@\n a\n-b\n+B\n+D\n c\n")
+        self.assertEqual(self.read("a.txt"), b"a\r\nB\r\nD\r\nc\r\n")
+
+    def test_diff_keeps_form_feeds_and_missing_final_newline(self):
+        self.write("a.txt", b"a\n\x0cb\nc")
+        edit_file(self.root, "a.txt", diff="@@ -1,3 +1,3 @@\n-a\n+A\n \x0cb\n c\n")
+        self.assertEqual(self.read("a.txt"), b"A\n\x0cb\nc")
+
+    def test_diff_deleting_last_line_without_newline(self):
+        self.write("a.txt", b"a\nb\nc")
+        edit_file(
+            self.root,
+            "a.txt",
+            diff="@@ -1,3 +1,2 @@\n a\n b\n-c\n\\ No newline at end of file\n",
+        )
+        self.assertEqual(self.read("a.txt"), b"a\nb\n")
+
+    def test_diff_adding_final_newline(self):
+        self.write("a.txt", b"a\nb")
+        result = edit_file(
+            self.root,
+            "a.txt",
+            diff="@@ -1,2 +1,2 @@\n a\n-b\n\\ No newline at end of file\n+b\n",
+        )
+        self.assertTrue(result.startswith("Successfully edited"), result)
+        self.assertEqual(self.read("a.txt"), b"a\nb\n")
+
+    def test_diff_removing_final_newline(self):
+        self.write("a.txt", b"a\nb\n")
+        edit_file(
+            self.root,
+            "a.txt",
+            diff="@@ -1,2 +1,2 @@\n a\n-b\n+b\n\\ No newline at end of file\n",
+        )
+        self.assertEqual(self.read("a.txt"), b"a\nb")
+
+    def test_edits_are_all_or_nothing(self):
+        self.write("a.py", b"x = 1\ny = 2\n")
+        result = edit_file(
+            self.root,
+            "a.py",
+            edits=[
+                {"old_text": "x = 1", "new_text": "x = 10"},
+                {"old_text": "missing", "new_text": "anything"},
+            ],
+        )
+        self.assertIn("The file was not changed", result)
+        self.assertEqual(self.read("a.py"), b"x = 1\ny = 2\n")
+
+    def test_diff_is_all_or_nothing(self):
+        self.write("a.py", b"one\ntwo\n")
+        result = edit_file(
+            self.root,
+            "a.py",
+            diff="@@ -1 +1 @@\n-one\n+ONE\n@@ -5 +5 @@\n-nope\n+NOPE\n",
+        )
+        self.assertIn("hunk 2 does not match", result)
+        self.assertEqual(self.read("a.py"), b"one\ntwo\n")
+
+    def test_ambiguous_old_text(self):
+        self.write("a.py", b"x\nx\n")
+        result = edit_file(
+            self.root, "a.py", edits=[{"old_text": "x", "new_text": "y"}]
+        )
+        self.assertIn("found 2 times", result)
+
+    def test_needs_exactly_one_of_edits_or_diff(self):
+        self.write("a.py", b"x\n")
+        self.assertIn("exactly one", edit_file(self.root, "a.py"))
+
+    def test_missing_file(self):
+        result = edit_file(
+            self.root, "nope.py", edits=[{"old_text": "a", "new_text": "b"}]
+        )
+        self.assertIn("File not found", result)
+
+    def test_outside_working_directory(self):
+        result = edit_file(
+            self.root, "../a.py", edits=[{"old_text": "a", "new_text": "b"}]
+        )
+        self.assertIn("outside the permitted working directory", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,15 @@
+from functions.get_file_content import get_file_content  # adjust import path as needed
+
+cases = [
+    {"file_path": "main.py"},
+    {"file_path": "main.py", "length": 40},
+    {"file_path": "main.py", "offset": 40, "length": 40},
+    {"file_path": "main.py", "length": 0},
+    {"file_path": "pkg/calculator.py", "start_line": 20, "end_line": 25},
+    {"file_path": "/bin/cat"},
+    {"file_path": "pkg/does_not_exist.py"},
+]
+for case in cases:
+    print(f"Result for {case}:")
+    print(get_file_content("calculator", **case))
+    print()
@@ -0,0 +1,15 @@
+import json
+
+# adjust import path as needed
+from functions.get_files_content import get_files_content
+
+cases = [
+    {"file_paths": ["main.py", "pkg/render.py"]},
+    {"pattern": "pkg/*.py"},
+    {"file_paths": ["main.py", "/bin/cat", "pkg/does_not_exist.py", "pkg"]},
+    {},
+]
+for case in cases:
+    print(f"Result for {case}:")
+    print(json.dumps(get_files_content("calculator", **case), indent=2))
+    print()
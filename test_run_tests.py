@@ -0,0 +1,14 @@
+import json
+
+from functions.run_tests import run_tests  # adjust import path as needed
+
+cases = [
+    {},
+    {},  # Nothing changed, so the results come from the cache
+    {"file_paths": ["tests.py"], "force": True},
+    {"file_paths": ["../main.py"]},
+]
+for case in cases:
+    print(f"Result for {case}:")
+    print(json.dumps(run_tests("calculator", **case), indent=2))
+    print()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+from functions.run_tests import run_tests
+from functions.write_file import write_file
+
+TEST_A = """import unittest
+
+from pkg.helpers import double
+
+
+class TestDouble(unittest.TestCase):
+    def test_double(self):
+        self.assertEqual(double(2), 4)
+"""
+
+
+class TestRunTestsCache(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.root = self._directory.name
+        os.mkdir(os.path.join(self.root, "pkg"))
+        with open(os.path.join(self.root, "pkg", "__init__.py"), "w") as file:
+            file.write("")
+        with open(os.path.join(self.root, "test_a.py"), "w") as file:
+            file.write(TEST_A)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_unchanged_tests_are_cached(self):
+        write_file(self.root, "pkg/helpers.py", "def double(x):\n    return 2 * x\n")
+        self.assertEqual(run_tests(self.root)["ran"], ["test_a.py"])
+        result = run_tests(self.root)
+        self.assertEqual(result["ran"], [])
+        self.assertEqual(result["cached"], ["test_a.py"])
+        self.assertEqual(result["passed"], 1)
+
+    def test_creating_a_missing_module_reruns_the_test(self):
+        result = run_tests(self.root)
+        self.assertEqual(result["errors"], 1)
+        self.assertIn("ModuleNotFoundError", result["problems"][0]["traceback"])
+
+        write_file(self.root, "pkg/helpers.py", "def double(x):\n    return 2 * x\n")
+        result = run_tests(self.root)
+        self.assertEqual(result["ran"], ["test_a.py"])
+        self.assertEqual(result["passed"], 1)
+        self.assertEqual(result["errors"], 0)
+
+    def test_module_created_behind_the_cache_reruns_the_test(self):
+        self.assertEqual(run_tests(self.root)["errors"], 1)
+        # Not through write_file, e.g. by a script the agent ran
+        os.mkdir(os.path.join(self.root, "pkg", "helpers"))
+        with open(
+            os.path.join(self.root, "pkg", "helpers", "__init__.py"), "w"
+        ) as file:
+            file.write("def double(x):\n    return x + x\n")
+        result = run_tests(self.root)
+        self.assertEqual(result["ran"], ["test_a.py"])
+        self.assertEqual(result["passed"], 1)
+
+    def test_same_named_helpers_in_different_directories(self):
+        for directory, value in (("a", 1), ("b", 2)):
+            os.mkdir(os.path.join(self.root, directory))
+            with open(os.path.join(self.root, directory, "helpers.py"), "w") as file:
+                file.write(f"v = {value}\n")
+            with open(
+                os.path.join(self.root, directory, f"test_{directory}.py"), "w"
+            ) as file:
+                file.write(
+                    "import unittest\n\nfrom helpers import v\n\n\n"
+                    "class TestHelpers(unittest.TestCase):\n"
+                    "    def test_v(self):\n"
+                    f"        self.assertEqual(v, {value})\n"
+                )
+        result = run_tests(self.root, ["a/test_a.py", "b/test_b.py"])
+        self.assertEqual(result["passed"], 2, result)
+        self.assertEqual(result["failed"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import errno
+import os
+import tempfile
+import unittest
+
+from functions.sandbox import Sandbox, get_sandbox
+
+
+class TestSandbox(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        base = os.path.realpath(self._directory.name)
+        self.root = os.path.join(base, "root")
+        self.outside = os.path.join(base, "outside")
+        os.makedirs(os.path.join(self.root, "a", "b"))
+        os.makedirs(self.outside)
+        self.write(os.path.join(self.root, "a", "b", "f.txt"), "inside")
+        self.write(os.path.join(self.outside, "secret.txt"), "secret")
+        self.sandbox = Sandbox(self.root)
+
+    def tearDown(self):
+        os.close(self.sandbox.fd)
+        self._directory.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as file:
+            file.write(text)
+
+    def link(self, target, name):
+        os.symlink(target, os.path.join(self.root, name))
+
+    def read(self, path):
+        with os.fdopen(self.sandbox.open(path), "r") as file:
+            return file.read()
+
+    def test_relative(self):
+        self.assertEqual(self.sandbox.relative("a/b/f.txt"), "a/b/f.txt")
+        self.assertEqual(self.sandbox.relative("./a/../a/b/f.txt"), "a/b/f.txt")
+        self.assertEqual(self.sandbox.relative("."), ".")
+        self.assertEqual(self.sandbox.relative(None), ".")
+        self.assertIsNone(self.sandbox.relative(".."))
+        self.assertIsNone(self.sandbox.relative("a/../../outside/secret.txt"))
+        self.assertIsNone(self.sandbox.relative(self.outside))
+
+    def test_dot_dot_inside_the_root(self):
+        self.assertEqual(self.read("a/b/../b/f.txt"), "inside")
+
+    def test_dot_dot_above_the_root(self):
+        with self.assertRaises(PermissionError):
+            self.sandbox.open("../outside/secret.txt")
+        with self.assertRaises(PermissionError):
+            self.sandbox.open("a/../../outside/secret.txt")
+
+    def test_symlinks_inside_the_root(self):
+        self.link("a/b", "relative_dir")
+        self.link(os.path.join(self.root, "a", "b", "f.txt"), "absolute_file")
+        self.link("../b/f.txt", "a/b/up_file")
+        self.assertEqual(self.read("relative_dir/f.txt"), "inside")
+        self.assertEqual(self.read("absolute_file"), "inside")
+        self.assertEqual(self.read("a/b/up_file"), "inside")
+
+    def test_relative_symlink_escape(self):
+        self.link("../outside", "escape")
+        self.link("../outside/secret.txt", "leak")
+        self.assertIsNone(self.sandbox.relative("escape/secret.txt"))
+        with self.assertRaises(PermissionError):
+            self.sandbox.open("escape/secret.txt")
+        with self.assertRaises(PermissionError):
+            self.sandbox.open("leak")
+
+    def test_absolute_symlink_escape(self):
+        self.link(self.outside, "escape")
+        self.link(os.path.join(self.outside, "secret.txt"), "leak")
+        with self.assertRaises(PermissionError):
+            self.sandbox.open("escape/secret.txt")
+        with self.assertRaises(PermissionError):
+            self.sandbox.open("leak")
+
+    def test_symlink_swapped_after_relative(self):
+        self.write(os.path.join(self.root, "swap"), "inside")
+        os.mkdir(os.path.join(self.root, "dir"))
+        self.assertEqual(self.sandbox.relative("swap"), "swap")
+        self.assertEqual(self.sandbox.relative("dir"), "dir")
+
+        # Checked and cached as inside, then replaced with links out
+        os.remove(os.path.join(self.root, "swap"))
+        self.link(os.path.join(self.outside, "secret.txt"), "swap")
+        os.rmdir(os.path.join(self.root, "dir"))
+        self.link(self.outside, "dir")
+        self.assertEqual(self.sandbox.relative("swap"), "swap")
+        with self.assertRaises(PermissionError):
+            self.sandbox.open("swap")
+        with self.assertRaises(PermissionError):
+            self.sandbox.open("dir/secret.txt")
+        with self.assertRaises(PermissionError):
+            self.sandbox.parent("dir/new.txt", create=True)
+
+        self.sandbox.clear()
+        self.assertIsNone(self.sandbox.relative("swap"))
+
+    def test_parent_create(self):
+        directory, name = self.sandbox.parent("x/y/z.txt", create=True)
+        try:
+            self.assertEqual(name, "z.txt")
+            self.assertTrue(
+                os.path.samestat(
+                    os.fstat(directory), os.stat(os.path.join(self.root, "x", "y"))
+                )
+            )
+        finally:
+            os.close(directory)
+
+    def test_parent_without_create(self):
+        with self.assertRaises(FileNotFoundError):
+            self.sandbox.parent("x/y/z.txt")
+        self.assertFalse(os.path.exists(os.path.join(self.root, "x")))
+
+    def test_parent_create_through_symlink_stays_inside(self):
+        self.link("a", "alias")
+        directory, name = self.sandbox.parent("alias/new/z.txt", create=True)
+        os.close(directory)
+        self.assertTrue(os.path.isdir(os.path.join(self.root, "a", "new")))
+
+    def test_symlink_loop(self):
+        self.link("loop_b", "loop_a")
+        self.link("loop_a", "loop_b")
+        with self.assertRaises(OSError) as raised:
+            self.sandbox.open("loop_a/f.txt")
+        self.assertEqual(raised.exception.errno, errno.ELOOP)
+
+    def test_file_in_place_of_a_directory(self):
+        with self.assertRaises(NotADirectoryError):
+            self.sandbox.open("a/b/f.txt/x")
+
+    def test_no_descriptor_leaks(self):
+        self.link("../outside", "escape")
+        before = len(os.listdir("/proc/self/fd"))
+        for _ in range(20):
+            os.close(self.sandbox.open("a/b/f.txt"))
+            with self.assertRaises(PermissionError):
+                self.sandbox.open("escape/secret.txt")
+            with self.assertRaises(FileNotFoundError):
+                self.sandbox.open("a/missing/f.txt")
+        self.assertEqual(len(os.listdir("/proc/self/fd")), before)
+
+    def test_get_sandbox_is_shared_per_root(self):
+        sandbox = get_sandbox(self.root)
+        self.assertIs(get_sandbox(self.root), sandbox)
+        self.assertIs(get_sandbox(os.path.join(self.root, "a", "..")), sandbox)
+
+
+if __name__ == "__main__":
+    unittest.main()
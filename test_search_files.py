@@ -0,0 +1,14 @@
+from functions.search_files import search_files  # adjust import path as needed
+
+cases = [
+    {"pattern": "def "},
+    {"pattern": "self.precedence[", "literal": True, "context": 1},
+    {"pattern": "LOREM", "ignore_case": True, "file_pattern": "*.txt"},
+    {"pattern": "import", "directory": "pkg"},
+    {"pattern": "import", "directory": "../"},
+    {"pattern": "("},
+]
+for case in cases:
+    print(f"Result for {case}:")
+    print(search_files("calculator", **case))
+    print()
@@ -0,0 +1,152 @@
+import contextvars
+import json
+import math
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from config import SESSION_MAX_ITERATIONS
+
+# Set by the agent loop for the duration of a session, and carried into tool
+# threads by asyncio.to_thread along with the rest of the context
+current_session = contextvars.ContextVar("current_session", default=None)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Tracer:
+    # Collects spans (timed operations) and events from the agent loop. Once
+    # open() has been called every record is appended to a JSON-lines file as
+    # it happens; records are kept in memory for the end-of-run summary only
+    # while keep_records is set, so a long-running server does not grow.
+    def __init__(self):
+        self.records = []
+        self.keep_records = False
+        self._file = None
+        self._lock = threading.Lock()
+
+    def open(self, path, keep_records=True):
+        self._file = open(path, "a", encoding="utf-8")
+        self.keep_records = keep_records
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _emit(self, record):
+        if not self.keep_records and not self._file:
+            return
+        record["session"] = current_session.get()
+        with self._lock:
+            if self.keep_records:
+                self.records.append(record)
+            if self._file:
+                self._file.write(json.dumps(record, default=str) + "\n")
+                self._file.flush()
+
+    def event(self, kind, **attributes):
+        self._emit({"type": "event", "kind": kind, "time": time.time(), **attributes})
+
+    @contextmanager
+    def span(self, kind, name, **attributes):
+        # The body can add attributes to the yielded dict, e.g. token counts
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._emit(
+                {
+                    "type": "span",
+                    "kind": kind,
+                    "name": name,
+                    "time": started,
+                    "duration_s": time.perf_counter() - start,
+                    **attributes,
+                }
+            )
+
+    def summary(self):
+        with self._lock:
+            records = list(self.records)
+
+        tools = defaultdict(list)
+        generations = []
+        sessions = []
+        waits = []
+        retries = []
+        for record in records:
+            if record["type"] == "span" and record["kind"] == "tool":
+                tools[record["name"]].append(record)
+            elif record["type"] == "span" and record["kind"] == "generate":
+                generations.append(record)
+            elif record["type"] == "event" and record["kind"] == "session":
+                sessions.append(record)
+            elif record["type"] == "event" and record["kind"] == "rate_limit_wait":
+                waits.append(record)
+            elif record["type"] == "event" and record["kind"] == "retry":
+                retries.append(record)
+
+        lines = ["Trace summary:"]
+        if generations:
+            durations = [record["duration_s"] for record in generations]
+            prompt_tokens = sum(
+                record.get("prompt_tokens") or 0 for record in generations
+            )
+            response_tokens = sum(
+                record.get("response_tokens") or 0 for record in generations
+            )
+            lines.append(
+                f"  generate_content: {len(generations)} calls, "
+                f"p50 {percentile(durations, 0.5):.3f}s, "
+                f"p95 {percentile(durations, 0.95):.3f}s, "
+                f"{sum(1 for record in generations if 'error' in record)} errors"
+            )
+            lines.append(
+                f"  tokens: {prompt_tokens} prompt, {response_tokens} response, "
+                f"{prompt_tokens + response_tokens} total"
+            )
+        if waits or retries:
+            lines.append(
+                f"  scheduler: {sum(record['seconds'] for record in waits):.3f}s "
+                f"waiting on rate limits ({len(waits)} waits), "
+                f"{sum(record['seconds'] for record in retries):.3f}s backing off "
+                f"({len(retries)} retries)"
+            )
+        for name, spans in sorted(tools.items()):
+            durations = [record["duration_s"] for record in spans]
+            lines.append(
+                f"  {name}: {len(spans)} calls, "
+                f"p50 {percentile(durations, 0.5):.3f}s, "
+                f"p95 {percentile(durations, 0.95):.3f}s, "
+                f"{sum(record.get('bytes', 0) for record in spans)} bytes returned, "
+                f"{sum(1 for record in spans if record.get('cache_hit'))} cache hits, "
+                f"{sum(1 for record in spans if 'error' in record)} errors"
+            )
+        for record in sessions:
+            stopped = f", stopped on {record['stopped']}" if record["stopped"] else ""
+            lines.append(
+                f"  session {record['session']}: "
+                f"{record['iterations']}/{SESSION_MAX_ITERATIONS} iterations, "
+                f"{record['prompt_tokens'] + record['response_tokens']} tokens, "
+                f"{record['duration_s']:.3f}s{stopped}"
+            )
+        return "\n".join(lines)
+
+
+tracer = Tracer()
+
+
+def print_summary(file=sys.stderr):
+    print(tracer.summary(), file=file)